@@ -1,19 +1,16 @@
 import streamlit as st
 import os
 import time
-from streamlit_chat import message
-from streamlit_option_menu import option_menu
-import plotly.express as px
-import pandas as pd
-import numpy as np
-
-from pdf_processor import PDFProcessor
-from vector_store import VectorStore
-from rag_engine import RAGEngine
-from config import *
+import threading
+import json
+import hashlib
+from collections import deque
 from pathlib import Path
-from login_signup import show_auth_page
-from dashboard import show_user_dashboard, show_admin_dashboard, log_chat, log_activity
+
+# The PDF/embedding/RAG modules (torch, faiss, PyMuPDF) and the dashboard (pandas, plotly)
+# are imported where they are first used; the RAG stack is loaded by the pre-warm thread,
+# so the login page renders without waiting for it
+from config import *
 
 # Page configuration
 st.set_page_config(
@@ -23,560 +20,270 @@ st.set_page_config(
     initial_sidebar_state=INITIAL_SIDEBAR_STATE
 )
 
-# Custom CSS for dark theme UI
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Global Dark Theme */
-    :root {
-        --primary: #7c4dff;
-        --primary-dark: #651fff;
-        --secondary: #1e1e2d;
-        --dark: #121212;
-        --darker: #0a0a0a;
-        --light: #e0e0e0;
-        --lighter: #f5f5f5;
-        --text: #ffffff;
-        --text-secondary: #b0b0b0;
-    }
-    
-    /* Base Styles */
-    .stApp {
-        background-color: var(--dark) !important;
-        color: var(--text) !important;
-    }
-    
-    .main {
-        font-family: 'Inter', sans-serif;
-        background-color: var(--dark);
-        color: var(--text);
-    }
-    
-    /* Header Styles */
-    .main-header {
-        background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-        padding: 3rem 2rem;
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        text-align: center;
-        color: white;
-        box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3);
-        position: relative;
-        overflow: hidden;
-        border: none;
-    }
-    
-    .main-header::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: linear-gradient(45deg, rgba(255,255,255,0.1) 0%, transparent 100%);
-        pointer-events: none;
-    }
-    
-    .main-header h1 {
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin: 0;
-        color: white;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    .main-header p {
-        font-size: 1.2rem;
-        font-weight: 300;
-        margin: 0.5rem 0 0 0;
-        opacity: 0.9;
-        color: rgba(255, 255, 255, 0.9);
-    }
-    
-    /* Chat Messages */
-    .stChatMessage {
-        background: var(--secondary) !important;
-        border-radius: 16px !important;
-        padding: 1rem !important;
-        margin: 0.5rem 0 !important;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.2) !important;
-        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        color: var(--text) !important;
-    }
-    
-    /* Text and Links */
-    body, .stTextInput>div>div>input, .stTextInput>div>div>textarea,
-    .stSelectbox>div>div>div>div>div, .stNumberInput>div>div>input,
-    .stSlider>div>div>div>div>div>div {
-        color: var(--text) !important;
-    }
-    
-    /* Sidebar */
-    .css-1d391kg, .css-1vq4p4l {
-        background-color: var(--darker) !important;
-        border-right: 1px solid rgba(255, 255, 255, 0.1) !important;
-    }
-    
-    /* Input Fields */
-    .stTextInput>div>div>input, .stTextArea>div>div>textarea,
-    .stSelectbox>div>div>div>div>div {
-        background-color: var(--secondary) !important;
-        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        color: var(--text) !important;
-    }
-    
-    /* Buttons */
-    .stButton>button {
-        background-color: var(--primary) !important;
-        color: white !important;
-        border: none !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    .stButton>button:hover {
-        background-color: var(--primary-dark) !important;
-        transform: translateY(-1px) !important;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.2) !important;
-    }
-    
-    /* Tabs */
-    .stTabs [data-baseweb="tab"] {
-        color: var(--text-secondary) !important;
-        background-color: transparent !important;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        color: var(--primary) !important;
-        background-color: rgba(124, 77, 255, 0.1) !important;
-    }
-    
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--darker);
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--primary);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--primary-dark);
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Initialize session state for authentication
-if 'logged_in' not in st.session_state:
-    st.session_state.logged_in = False
-if 'user' not in st.session_state:
-    st.session_state.user = None
-if 'username' not in st.session_state:
-    st.session_state.username = None
-if 'initialized' not in st.session_state:
-    st.session_state.initialized = False
-
-# Initialize session state for app functionality
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
-if 'vector_store' not in st.session_state:
-    st.session_state.vector_store = None
-if 'rag_engine' not in st.session_state:
-    st.session_state.rag_engine = None
-if 'pdf_processed' not in st.session_state:
-    st.session_state.pdf_processed = False
-
-# Ensure one-time initialization per app run (not every Streamlit rerun)
-if 'initialized' not in st.session_state:
-    st.session_state.initialized = False
+# Stylesheets and static page content (About page) live in static/
+STATIC_DIR = Path(__file__).parent / "static"
+# Source document for the vector store, resolved once per run instead of per query
+PDF_PATH = Path(__file__).parent / "MOSDAC.pdf"
 
 
-def initialize_system():
-    """Initialize the RAG system"""
+@st.cache_data(show_spinner=False)
+def load_static(name: str) -> str:
+    """Read a stylesheet or page fragment from the static directory (cached across reruns)"""
+    return (STATIC_DIR / name).read_text(encoding="utf-8")
+
+
+def inject_css(*names: str):
+    """Inject the given stylesheets, in order, as a single <style> tag"""
+    css = "\n".join(load_static(name) for name in names)
+    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+
+
+def _init_state():
+    """Seed session state defaults; existing keys are left untouched"""
+    # Authentication
+    st.session_state.setdefault('logged_in', False)
+    st.session_state.setdefault('user', None)
+    st.session_state.setdefault('username', None)
+    # App functionality; 'initialized' is set once the RAG system has loaded on the first question
+    st.session_state.setdefault('initialized', False)
+    # Bounded: appending past CHAT_HISTORY_WINDOW drops the oldest message (all turns stay in chat_history)
+    st.session_state.setdefault('messages', deque(maxlen=CHAT_HISTORY_WINDOW))
+
+
+@st.cache_data(show_spinner=False)
+def _pdf_fingerprint(pdf_path: str, mtime: float, size: int) -> str:
+    """SHA-256 of the PDF contents; mtime and size only key the cache so edits are rehashed"""
+    h = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _index_key(fingerprint: str) -> str:
+    """Key for the index of this PDF content under the current embedding model and chunking"""
+    params = f"{fingerprint}:{EMBEDDING_MODEL}:{CHUNK_SIZE}:{CHUNK_OVERLAP}:{CHUNKER_VERSION}"
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+
+def _register_vector_store(vs_dir: Path, index_key: str, vs_path: str):
+    """Record the index built for this key and delete indices beyond the newest few"""
+    manifest_path = vs_dir / f"{VECTOR_STORE_NAME}.manifest.json"
     try:
-        # Ensure persistence directory
-        vs_dir = Path(VECTOR_STORE_DIR)
-        vs_dir.mkdir(parents=True, exist_ok=True)
-        vs_path = vs_dir / VECTOR_STORE_NAME
-
-        # Check if PDF exists
-        pdf_path = "MOSDAC.pdf"
-        if not os.path.exists(pdf_path):
-            st.error("MOSDAC.pdf not found in the current directory.")
-            return False
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+    if index_key in manifest:
+        return
+
+    manifest[index_key] = {"path": vs_path, "created": time.time()}
+    # Keep only the newest indices; older PDF versions or settings are rebuilt if they ever come back
+    newest = sorted(manifest, key=lambda h: manifest[h]["created"], reverse=True)
+    for stale in newest[VECTOR_STORE_KEEP:]:
+        for f in vs_dir.glob(f"{VECTOR_STORE_NAME}.{stale[:12]}.*"):
+            f.unlink(missing_ok=True)
+        del manifest[stale]
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+@st.cache_resource(show_spinner="Processing PDF and building vector index (first run only)...")
+def _get_vector_store(model_name: str, vs_path: str, pdf_path: str, embedding_cache_path: str, index_key: str):
+    """Load (or build once) the vector store, shared process-wide across sessions"""
+    from vector_store import VectorStore
+    from pdf_processor import PDFProcessor
+    
+    vector_store = VectorStore(model_name, embedding_cache_path=embedding_cache_path)
+    # Try load cached vector store
+    if not vector_store.load(vs_path):
+        # Process PDF and build index once, streaming page -> chunk -> embedding batch
+        pdf_processor = PDFProcessor(pdf_path)
+        vector_store.add_texts_stream(pdf_processor.iter_chunks(CHUNK_SIZE, CHUNK_OVERLAP))
         
-        vector_store = VectorStore(EMBEDDING_MODEL)
-        # Try load cached vector store
-        loaded = vector_store.load(str(vs_path))
-        if not loaded:
-            # Process PDF and build index once
-            with st.spinner("Processing PDF and building vector index (first run only)..."):
-                pdf_processor = PDFProcessor(pdf_path)
-                text = pdf_processor.extract_text()
-                
-                if not text:
-                    st.error("Failed to extract text from PDF.")
-                    return False
-                
-                # Create chunks
-                chunks = pdf_processor.get_text_chunks(CHUNK_SIZE, CHUNK_OVERLAP)
-                
-                # Build index
-                vector_store.add_texts(chunks)
-                # Save for reuse
-                vector_store.save(str(vs_path))
-            
-        # Create RAG engine
-        rag_engine = RAGEngine(vector_store)
+        if not vector_store.texts:
+            raise ValueError("Failed to extract text from PDF.")
         
-        # Store in session state
-        st.session_state.vector_store = vector_store
-        st.session_state.rag_engine = rag_engine
-        st.session_state.pdf_processed = True
-            
-        return True
+        # Save for reuse
+        vector_store.save(vs_path)
+    _register_vector_store(Path(vs_path).parent, index_key, vs_path)
+    return vector_store
+
+
+@st.cache_resource(show_spinner=False)
+def _get_rag_engine(vs_path: str, _vector_store):
+    """Create the RAG engine once per vector store (keyed on its path; the store itself is not hashed)"""
+    from rag_engine import RAGEngine
+    # Cached answers live next to the index they were retrieved from, so they are
+    # dropped along with it when the PDF changes
+    return RAGEngine(_vector_store, response_cache_path=f"{vs_path}.responses")
+
+
+def _load_rag_engine(pdf_path: str):
+    """Return the shared RAG engine for the current contents of pdf_path"""
+    # Ensure persistence directory
+    vs_dir = Path(VECTOR_STORE_DIR)
+    vs_dir.mkdir(parents=True, exist_ok=True)
+
+    # The index is named after the PDF's content hash together with the embedding model
+    # and chunking settings: a replaced PDF or changed settings get a fresh index, and
+    # identical inputs reuse the existing one whatever the PDF's timestamp.
+    # This stat is the only filesystem check per query; it raises if the PDF is missing
+    stat = os.stat(pdf_path)
+    index_key = _index_key(_pdf_fingerprint(pdf_path, stat.st_mtime, stat.st_size))
+    vs_path = str(vs_dir / f"{VECTOR_STORE_NAME}.{index_key[:12]}")
+    
+    vector_store = _get_vector_store(
+        EMBEDDING_MODEL, vs_path, pdf_path, str(vs_dir / EMBEDDING_CACHE_NAME), index_key
+    )
+    return _get_rag_engine(vs_path, vector_store)
+
+
+def _warm_rag_engine(pdf_path: str):
+    """Load the model and index, then run one search so the first real query starts hot"""
+    try:
+        _load_rag_engine(pdf_path).vector_store.search("MOSDAC", 1)
+    except Exception as e:
+        # initialize_system reports the error to the user when they ask a question
+        print(f"Warning: RAG pre-warm failed: {e}")
+
+
+@st.cache_resource(show_spinner=False)
+def _start_prewarm(pdf_path: str):
+    """Start warming the RAG system in a background thread, once per process.
+    The script module is re-executed on every run, so the guard is the resource cache."""
+    thread = threading.Thread(target=_warm_rag_engine, args=(pdf_path,), name="rag-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def initialize_system():
+    """Initialize the RAG system and return the shared RAG engine, or None on failure"""
+    try:
+        # Waits on the cached resources if the pre-warm thread is still loading them
+        return _load_rag_engine(str(PDF_PATH))
         
+    except FileNotFoundError:
+        st.error(f"{PDF_PATH.name} not found in {PDF_PATH.parent}.")
+        return None
     except Exception as e:
         st.error(f"Error initializing system: {str(e)}")
-        return False
+        return None
 
+@st.fragment
 def display_chat_interface():
-    """Display the chat interface with input at the bottom"""
+    """Display the chat interface with input at the bottom.
+    Runs as a fragment: a chat turn reruns only this function, not the sidebar or other tabs."""
     # Create a container for chat messages
     chat_container = st.container()
     
-    # Display chat history
+    # Display chat history (the session keeps only the last CHAT_HISTORY_WINDOW messages)
     with chat_container:
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+        for msg in st.session_state.messages:
+            with st.chat_message(msg["role"]):
+                st.markdown(msg["content"])
     
-    # Fixed chat input at the bottom
-    st.markdown("""
-    <style>
-        .fixed-bottom {
-            position: fixed;
-            bottom: 2rem;
-            left: 2rem;
-            right: 2rem;
-            z-index: 1000;
-            background: var(--darker);
-            padding: 1rem 0;
-            margin-top: 2rem;
-        }
-        @media (max-width: 768px) {
-            .fixed-bottom {
-                left: 1rem;
-                right: 1rem;
-                bottom: 1rem;
-            }
-        }
-    </style>
-    <div class="fixed-bottom">
-    """, unsafe_allow_html=True)
+    # Fixed chat input at the bottom (styled by .fixed-bottom in static/main.css)
+    st.markdown('<div class="fixed-bottom">', unsafe_allow_html=True)
     
     # Chat input - this will be at the bottom
-    if prompt := st.chat_input("Ask me anything about MOSDAC..."):
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        # Rerun to update the chat display
-        st.rerun()
+    prompt = st.chat_input("Ask me anything about MOSDAC...")
     
     st.markdown("</div>", unsafe_allow_html=True)
     
-    # If there's a new message, process and add the assistant's response
-    if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-        user_message = st.session_state.messages[-1]["content"]
-        
-        # Start measuring response time
-        start_time = time.time()
-        
-        # Generate the response
-        if st.session_state.rag_engine:
-            result = st.session_state.rag_engine.query(user_message)
-            response = result["response"]
-        else:
-            response = "System not ready. Ensure MOSDAC.pdf exists and API key is set."
-        
-        response_time = int((time.time() - start_time) * 1000)  # in milliseconds
-        
-        # Log the chat and update query count in real-time
-        if 'user' in st.session_state and st.session_state.user:
-            try:
-                from dashboard import log_chat
-                
-                # Clear any cached analytics data
-                if 'analytics_data' in st.session_state:
-                    del st.session_state.analytics_data
+    if not prompt:
+        return
+    
+    # Render the new turn in place during this run instead of rerunning the whole script
+    st.session_state.messages.append({"role": "user", "content": prompt})
+    with chat_container:
+        with st.chat_message("user"):
+            st.markdown(prompt)
+    
+    # Start measuring response time
+    start_time = time.time()
+    
+    # The RAG system is loaded on the first question rather than when the Chat tab
+    # renders; later calls are cache lookups
+    if not st.session_state.initialized:
+        with st.spinner("Loading index..."):
+            rag_engine = initialize_system()
+        st.session_state.initialized = rag_engine is not None
+    else:
+        rag_engine = initialize_system()
+    with chat_container:
+        with st.chat_message("assistant"):
+            if rag_engine:
+                # Render tokens as Gemini produces them; write_stream returns the full text
+                response = st.write_stream(
+                    rag_engine.query_stream(prompt, namespace=st.session_state.username or "")
+                )
+            else:
+                response = "System not ready. Ensure MOSDAC.pdf exists and API key is set."
+                st.markdown(response)
+    
+    response_time = int((time.time() - start_time) * 1000)  # in milliseconds
+    
+    # Add assistant's response to chat history; older turns live on in chat_history
+    st.session_state.messages.append({"role": "assistant", "content": response})
+    
+    # Log the chat in the background and update the query count in real-time
+    if 'user' in st.session_state and st.session_state.user:
+        try:
+            from dashboard import log_chat_async
+            
+            # Clear any cached analytics data
+            if 'analytics_data' in st.session_state:
+                del st.session_state.analytics_data
+            
+            # Queued for a background writer so the database write is off the response path
+            log_chat_async(
+                user_id=st.session_state.user['id'],
+                query=prompt,
+                response=response,
+                response_time_ms=response_time
+            )
+            
+            # Picked up by the sidebar on the next run
+            if 'user_stats' in st.session_state:
+                st.session_state.user_stats['total_queries'] = st.session_state.user_stats.get('total_queries', 0) + 1
+            
+            # Force a complete refresh of the analytics data
+            if 'last_analytics' in st.session_state:
+                del st.session_state.last_analytics
                 
-                # Log the chat and get the new query count
-                try:
-                    new_count = log_chat(
-                        user_id=st.session_state.user['id'],
-                        query=user_message,
-                        response=response,
-                        response_time_ms=response_time
-                    )
-                    
-                    # Update the UI immediately
-                    if 'user_stats' in st.session_state:
-                        st.session_state.user_stats['total_queries'] = new_count
-                    
-                    # Force a complete refresh of the analytics data
-                    if 'last_analytics' in st.session_state:
-                        del st.session_state.last_analytics
-                    
-                    # Add assistant's response to chat history
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    
-                    # Force a complete page refresh to ensure fresh data
-                    st.rerun()
-                    
-                except ValueError as ve:
-                    st.error(f"⚠️ {str(ve)}. Please log in again.")
-                    # Clear the session and redirect to login
-                    st.session_state.clear()
-                    st.rerun()
-                    
-            except Exception as e:
-                st.error(f"❌ Error logging chat: {str(e)}")
-                import traceback
-                st.error(traceback.format_exc())
-        
-        # If there's no user logged in, still show the response
-        else:
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
+        except Exception as e:
+            st.error(f"❌ Error logging chat: {str(e)}")
+            import traceback
+            st.error(traceback.format_exc())
     
 
 def show_welcome_page():
     """Display welcome page with About MOSDAC information after successful login"""
-    st.markdown("""
-    <div style="
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        min-height: 30vh;
-        text-align: center;
-        margin-bottom: 2rem;
-    ">
-        <h1 style="
-            font-size: 4rem;
-            font-weight: 700;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            margin-bottom: 1rem;
-        ">Welcome to MOSDAC-Simplified!</h1>
-        <p style="
-            font-size: 1.5rem;
-            color: #6c757d;
-            margin-top: 1rem;
-        ">Start exploring meteorological and oceanographic data</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(load_static("welcome.html"), unsafe_allow_html=True)
     
     # Add About MOSDAC content
-    st.markdown("""
-### 🌐 About MOSDAC
-
-MOSDAC (Meteorological & Oceanographic Satellite Data Archival Centre) is an initiative of the Space Applications Centre (SAC), Indian Space Research Organisation (ISRO), Ahmedabad.
-
-It is a dedicated data archive and service portal for satellite data and related products focused on meteorology, oceanography, and tropical weather. MOSDAC acts as a gateway for space-based information, enabling researchers, students, institutions, and decision-makers to utilize satellite data for scientific research, operational services, and societal applications.
-
-### 📌 Key Objectives of MOSDAC
-- 🛰️ **Archival & Dissemination of Data**: Securely store and provide access to satellite data for long-term usage.
-- 🌦️ **Support for Weather & Climate Services**: Provide data that enhances weather forecasting, climate monitoring, and disaster management.
-- 🌊 **Oceanographic Applications**: Enable ocean state forecasting, cyclone tracking, fisheries, and coastal management.
-- 🔬 **Research Facilitation**: Empower scientists, students, and developers with high-quality datasets for innovative applications.
-- 📡 **Real-time Data Access**: Ensure that operational agencies can use near-real-time data for quick decision-making.
-
-### 🌍 Types of Data & Services Available
-1. **Meteorological Data**
-   - Weather parameters (clouds, temperature, humidity, rainfall)
-   - Monsoon studies
-   - Cyclone monitoring and tracking
-2. **Oceanographic Data**
-   - Sea surface temperature
-   - Ocean color (chlorophyll, productivity)
-   - Ocean waves and currents
-   - Coastal monitoring
-3. **Atmospheric & Climate Data**
-   - Climate variability studies
-   - Long-term datasets for research
-   - Extreme weather event analysis
-4. **Satellite Missions Covered**
-   - INSAT Series
-   - Oceansat Series
-   - Megha-Tropiques
-   - Scatsat-1
-   - Other ISRO meteorology & oceanography satellites
-
-### 🎯 Applications of MOSDAC Data
-- Weather Forecasting – Improved short, medium, and long-range forecasts.
-- Disaster Management – Early warning for cyclones, floods, and extreme weather.
-- Agriculture – Rainfall monitoring, crop assessment, drought prediction.
-- Fisheries & Coastal Management – Ocean productivity and fishery zone advisories.
-- Climate Research – Long-term climate variability and global warming studies.
-- Education & Training – Helping students and researchers understand earth systems.
-
-### 🤖 About This Chatbot
-This chatbot has been created to simplify access to MOSDAC information. Instead of browsing multiple sections, you can ask your queries directly here.
-
-With this chatbot, you can:
-- 🔍 Search for available data and datasets.
-- 📂 Learn how to access MOSDAC portals.
-- 🌦️ Get explanations about weather, ocean, and climate-related parameters.
-- 🎓 Understand the role of ISRO satellites in meteorology and oceanography.
-- 💡 Receive educational help for research and student projects.
-
-### 🚀 Why MOSDAC Matters
-Satellite data is critical for India and the world to monitor our atmosphere, oceans, and climate. By providing free and accessible datasets, MOSDAC bridges the gap between space technology and real-world applications, ensuring that information from space benefits everyone — from farmers to scientists, from students to policymakers.
-
-✨ Start chatting in the chat section to explore the world of MOSDAC data and services in a simple, interactive way!
-    """)
+    st.markdown(load_static("about.md"))
 
 
 def main():
-    # Set page config - must be the first Streamlit command
-    st.set_page_config(
-        page_title="MOSDAC Simplified",
-        page_icon="🌐",
-        layout="wide",
-        initial_sidebar_state="expanded"
-    )
+    # Page config is set once at module level; seed session state defaults
+    _init_state()
     
-    # Check if user is logged in
-    if 'logged_in' not in st.session_state:
-        st.session_state.logged_in = False
+    # Start loading the model and index on the process's first run, whatever page it
+    # shows; a question asked before it finishes waits on the same cached resources
+    _start_prewarm(str(PDF_PATH))
     
     # Show login page if not logged in
     if not st.session_state.logged_in:
-        # Apply custom styles for auth pages
-        st.markdown("""
-        <style>
-            /* Full page background */
-            .stApp {
-                background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%) !important;
-                height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-            }
-            
-            /* Center the auth container */
-            .block-container {
-                max-width: 500px !important;
-                padding: 0 !important;
-            }
-            
-            /* Remove extra spacing */
-            .stApp > div:first-child {
-                width: 100%;
-            }
-        </style>
-        """, unsafe_allow_html=True)
+        # Apply the base theme plus auth page and login/signup form styles
+        inject_css("app.css", "auth.css", "login.css")
         
         # Show auth page
         from login_signup import show_auth_page
         show_auth_page()
         return
     
-    # Custom CSS for main app
-    st.markdown("""
-    <style>
-        /* Main header styling */
-        .main-header {
-            background: linear-gradient(135deg, #1a237e 0%, #0d47a1 100%);
-            padding: 1.5rem;
-            margin: -1rem -1rem 2rem -1rem;
-            color: white;
-            text-align: center;
-            box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
-        }
-        
-        .main-header h1 {
-            font-size: 2.2rem;
-            margin-bottom: 0.5rem;
-            letter-spacing: 1px;
-        }
-        
-        .main-header p {
-            font-size: 1.1rem;
-            opacity: 0.9;
-            margin: 0;
-        }
-        
-        /* Tab styling */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 0.5rem;
-            margin-bottom: 1.5rem;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            background: #f5f5f5;
-            border-radius: 8px 8px 0 0;
-            padding: 0.75rem 1.5rem;
-            font-weight: 500;
-            color: #555;
-            transition: all 0.2s;
-            border: none;
-            margin: 0;
-        }
-        
-        .stTabs [data-baseweb="tab"]:hover {
-            background: #e0e0e0;
-            color: #333;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background: #fff;
-            color: #1a237e;
-            font-weight: 600;
-            box-shadow: 0 -2px 0 #1a237e inset;
-        }
-        
-        .stTabs [data-baseweb="tab-panel"] {
-            padding: 1.5rem 0;
-        }
-        
-        /* Chat message styling */
-        .stChatMessage {
-            margin: 0.5rem 0;
-            padding: 0.75rem 1rem;
-            border-radius: 8px;
-            background: #f8f9fa;
-        }
-        
-        /* Input area */
-        .stTextInput > div > div > input {
-            border-radius: 8px !important;
-            padding: 0.75rem 1rem !important;
-            border: 1px solid #ddd !important;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Initialize session state
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
-    if 'initialized' not in st.session_state:
-        st.session_state.initialized = False
-    if 'user' not in st.session_state:
-        st.session_state.user = None
-    if 'username' not in st.session_state:
-        st.session_state.username = None
-    if 'logged_in' not in st.session_state:
-        st.session_state.logged_in = False
+    # Apply the base theme plus main app styles
+    inject_css("app.css", "main.css")
     
     # Header
     st.markdown("""
@@ -601,12 +308,12 @@ def main():
         if st.button("Sign Out", use_container_width=True, key="logout_btn"):
             st.session_state.logged_in = False
             st.session_state.user = None
-            st.session_state.messages = []
+            st.session_state.messages.clear()
             st.rerun()
         
         # Clear chat
         if st.button("🗑️ Clear Chat History", help="Clear all chat messages"):
-            st.session_state.messages = []
+            st.session_state.messages.clear()
             st.rerun()
         
         # Additional info
@@ -619,66 +326,27 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
-    # Main content area with navigation
-    st.markdown("""
-    <style>
-        /* Style the navigation tabs */
-        .stTabs [data-baseweb="tab-list"] {
-            justify-content: center;
-            margin-bottom: 1.5rem;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            padding: 0.5rem 2rem;
-            border-radius: 20px;
-            margin: 0 0.5rem;
-            transition: all 0.3s ease;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background-color: #667eea !important;
-            color: white !important;
-        }
-        
-        .stTabs [aria-selected="false"] {
-            background-color: #f0f2f6 !important;
-        }
-    </style>
-    """, unsafe_allow_html=True)
     
-    # Create tabs for navigation based on user
-    if 'username' in st.session_state:
-        # Show Analytics tab only for 'bhumi' user
-        if st.session_state.username.lower() == 'bhumi':
-            tab1, tab2, tab3 = st.tabs(["📊 Analytics", "💬 Chat", "ℹ️ About"])
-            
-            with tab1:
-                # Force refresh when Analytics tab is opened
-                if 'analytics_data' in st.session_state:
-                    del st.session_state.analytics_data
-                from dashboard import show_analytics_dashboard
-                show_analytics_dashboard()
-                
-            with tab2:
-                if not st.session_state.initialized:
-                    with st.spinner("Initializing system..."):
-                        initialize_system()
-                    st.session_state.initialized = True
-                display_chat_interface()
-                
-            with tab3:
-                show_welcome_page()
-        else:
-            # Regular user tabs
-            tab1, tab2 = st.tabs(["💬 Chat", "ℹ️ About"])
-            with tab1:
-                if not st.session_state.initialized:
-                    with st.spinner("Initializing system..."):
-                        initialize_system()
-                    st.session_state.initialized = True
-                display_chat_interface()
-            with tab2:
-                show_welcome_page()
+    # Create tabs for navigation based on user; the Analytics tab is only for 'bhumi'
+    show_analytics = (st.session_state.username or "").lower() == 'bhumi'
+    tab_labels = ["💬 Chat", "ℹ️ About"]
+    if show_analytics:
+        tab_labels.insert(0, "📊 Analytics")
+    tabs = st.tabs(tab_labels)
+    
+    if show_analytics:
+        with tabs[0]:
+            # Force refresh when Analytics tab is opened
+            if 'analytics_data' in st.session_state:
+                del st.session_state.analytics_data
+            from dashboard import show_analytics_dashboard
+            show_analytics_dashboard()
+    
+    with tabs[-2]:
+        display_chat_interface()
+    
+    with tabs[-1]:
+        show_welcome_page()
 
 
 if __name__ == "__main__":
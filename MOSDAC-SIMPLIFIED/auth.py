@@ -5,20 +5,148 @@ Handles user registration, login, and database operations
 
 import sqlite3
 import hashlib
+import hmac
+import os
 import re
+import threading
+import queue
+import atexit
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 # Database configuration
 DB_NAME = "users.db"
+SQLITE_MMAP_SIZE = 64 * 1024 * 1024  # bytes of the database file read through mmap
+SQLITE_CACHE_SIZE_KIB = 64 * 1024  # page cache limit per connection (grows on demand)
+SQLITE_POOL_SIZE = 8  # idle connections kept open for reuse
+# Parsed statements kept per connection; covers every distinct query in auth and the dashboard
+SQLITE_CACHED_STATEMENTS = 256
+# Stored in PRAGMA user_version once init/migrations have run; bump it whenever
+# init_database() or migrate_database() change so existing databases are upgraded
+SCHEMA_VERSION = 2
+# Set once ensure_database() has checked the schema in this process (nothing runs on import)
+_database_ready = False
+_database_lock = threading.Lock()
+
+# Partial covering index for response-time analytics (only rows that recorded a time)
+CHAT_RESPONSE_TIME_INDEX = (
+    'CREATE INDEX IF NOT EXISTS idx_chat_history_time_rt ON chat_history(timestamp, response_time_ms) '
+    'WHERE response_time_ms IS NOT NULL'
+)
+
+# Admin accounts created by init_database() when missing: (username, email, password)
+SEED_USERS = [
+    ("admin", "admin@example.com", "admin123"),  # In production, use a secure password
+    ("bhumi", "bhumi@example.com", "Bhumi@23"),  # Using the password from run.bat
+]
+
+# register_user()'s activity log text and success message, keyed on is_admin
+REGISTRATION_MESSAGES = {
+    False: ('New user account created', 'User registration successful!'),
+    True: ('New admin account created', 'Admin registration successful!'),
+}
+
+# Input validation patterns, compiled once
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+USERNAME_RE = re.compile(r'[^\W_]{3,20}')  # 3-20 alphanumeric characters, as str.isalnum()
+
+# Password hashing: scrypt with a per-user random salt (n=2**14, r=8 uses 16 MiB per hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+
+# Recent verification results, keyed on (stored hash, keyed digest of the attempt) so
+# repeat logins skip the KDF; plain passwords are never kept in memory
+VERIFY_CACHE_SIZE = 256
+_verify_cache = OrderedDict()
+_verify_cache_lock = threading.Lock()
+_VERIFY_CACHE_KEY = os.urandom(32)
+
+# Recently fetched user rows for get_user_by_id(); entries expire so edits made
+# directly in the database show up within USER_CACHE_TTL seconds
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 60
+_user_cache = OrderedDict()  # user_id -> (expires_at, user dict)
+_user_cache_lock = threading.Lock()
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection handed out by get_db_connection(); close() returns it to the shared
+    pool instead of closing the file
+    """
+    checked_out = False
+
+    def close(self):
+        # Releasing twice must not put the same connection in the pool twice
+        if not self.checked_out:
+            return
+        self.checked_out = False
+        try:
+            # Discard uncommitted work before the next caller gets the connection
+            if self.in_transaction:
+                self.rollback()
+            _pool.put_nowait(self)
+        except (sqlite3.Error, queue.Full):
+            self.close_for_good()
+
+    def close_for_good(self):
+        """Really close the connection, refreshing planner statistics first"""
+        try:
+            # Cheap no-op unless this connection's queries would benefit from ANALYZE
+            self.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
+        super().close()
+
+
+# Idle connections shared by all threads; LIFO so the warmest page cache is reused first
+_pool = queue.LifoQueue(maxsize=SQLITE_POOL_SIZE)
+
+
+def _open_connection():
+    """Open a connection with the pragmas every pooled connection uses"""
+    # Pooled connections outlive a single call, so the statement cache (keyed on the
+    # SQL text) lets repeat queries skip parsing and planning. A connection is only
+    # used by the thread that checked it out, so it may move between threads.
+    conn = sqlite3.connect(DB_NAME, factory=PooledConnection, cached_statements=SQLITE_CACHED_STATEMENTS,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Enable column access by name
+    # WAL lets readers run alongside the writer and, with synchronous=NORMAL,
+    # commits no longer fsync the main database file
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    # Negative cache_size is in KiB rather than pages
+    conn.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size = {SQLITE_MMAP_SIZE}')
+    # foreign_keys stays at SQLite's default (OFF): the table-copy migrations here and in
+    # dashboard.update_database_schema drop parent tables, which would cascade if enforced
+    return conn
+
+
+@atexit.register
+def _close_pool():
+    """Close the idle pooled connections when the process exits"""
+    while True:
+        try:
+            _pool.get_nowait().close_for_good()
+        except queue.Empty:
+            break
+
 
 def get_db_connection():
     """
-    Create and return a database connection
+    Check out a database connection from the pool, opening a new one if none is idle
     Returns:
-        sqlite3.Connection: Database connection object
+        sqlite3.Connection: Database connection object (close() returns it to the pool)
     """
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # Enable column access by name
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    conn.checked_out = True
     return conn
 
 
@@ -31,9 +159,6 @@ def migrate_database():
     cursor = conn.cursor()
     
     try:
-        # Disable foreign key constraints during migration
-        cursor.execute('PRAGMA foreign_keys = OFF')
-        
         # Check if chat_history table exists first
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='chat_history'")
         if cursor.fetchone():
@@ -71,8 +196,9 @@ def migrate_database():
                 cursor.execute('ALTER TABLE chat_history_new RENAME TO chat_history')
                 
                 # Recreate indexes
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history(user_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_user_time ON chat_history(user_id, timestamp)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp)')
+                cursor.execute(CHAT_RESPONSE_TIME_INDEX)
                 
                 print("Successfully added timestamp column to chat_history table")
         
@@ -112,7 +238,7 @@ def migrate_database():
                 cursor.execute('ALTER TABLE user_activity_new RENAME TO user_activity')
                 
                 # Recreate indexes
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_user_id ON user_activity(user_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_user_time ON user_activity(user_id, timestamp)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_timestamp ON user_activity(timestamp)')
                 
                 print("Successfully added timestamp column to user_activity table")
@@ -125,8 +251,6 @@ def migrate_database():
         conn.rollback()
         raise
     finally:
-        # Re-enable foreign key constraints
-        cursor.execute('PRAGMA foreign_keys = ON')
         conn.close()
 
 
@@ -139,9 +263,6 @@ def init_database():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Disable foreign key constraints temporarily to avoid issues with table recreation
-        cursor.execute('PRAGMA foreign_keys = OFF')
-        
         try:
             # Create users table
             cursor.execute('''
@@ -195,52 +316,48 @@ def init_database():
             )
             ''')
             
-            # Create indexes for better performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history(user_id)')
+            # Create indexes for better performance. Per-user history is read newest first,
+            # so user_id is paired with timestamp (username/email are indexed by UNIQUE)
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type='index' "
+                "AND name IN ('idx_chat_history_user_time', 'idx_chat_history_time_rt')"
+            )
+            new_indexes = cursor.fetchone()[0] < 2
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_user_time ON chat_history(user_id, timestamp)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_user_id ON user_activity(user_id)')
+            # Covers the dashboard's response-time stats and 30-day trend without touching rows
+            cursor.execute(CHAT_RESPONSE_TIME_INDEX)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_user_time ON user_activity(user_id, timestamp)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_timestamp ON user_activity(timestamp)')
+            # The composite indexes cover user_id-only lookups too
+            cursor.execute('DROP INDEX IF EXISTS idx_chat_history_user_id')
+            cursor.execute('DROP INDEX IF EXISTS idx_user_activity_user_id')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_queries_user_id ON user_queries(user_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_queries_username ON user_queries(username)')
             
-            # Always delete and recreate admin user to ensure credentials are reset
-            admin_username = "admin"
-            admin_email = "admin@example.com"
-            admin_password = "admin123"  # In production, use a secure password
-            
-            # Delete existing admin user if exists
-            cursor.execute('DELETE FROM users WHERE username = ?', (admin_username,))
-            
-            # Create admin user with hashed password
-            password_hash = hashlib.sha256(admin_password.encode()).hexdigest()
+            # Create the seed admin accounts that don't exist yet (existing accounts, their
+            # passwords and history are left untouched); one lookup, one batched insert
             cursor.execute(
-                'INSERT INTO users (username, email, password_hash, is_admin, is_active) VALUES (?, ?, ?, ?, ?)',
-                (admin_username, admin_email, password_hash, 1, 1)
+                f"SELECT username FROM users WHERE username IN ({', '.join('?' * len(SEED_USERS))})",
+                [username for username, _, _ in SEED_USERS]
             )
-            print(f"[SUCCESS] Created admin user with username: {admin_username}, password: {admin_password}")
-            
-            # Always delete and recreate bhumi user to ensure credentials are reset
-            bhumi_username = "bhumi"
-            bhumi_email = "bhumi@example.com"
-            bhumi_password = "Bhumi@23"  # Using the password from run.bat
-            
-            # Delete existing bhumi user if exists
-            cursor.execute('DELETE FROM users WHERE username = ?', (bhumi_username,))
-            
-            # Create bhumi user with hashed password
-            password_hash = hashlib.sha256(bhumi_password.encode()).hexdigest()
-            cursor.execute(
-                'INSERT INTO users (username, email, password_hash, is_admin, is_active) VALUES (?, ?, ?, ?, ?)',
-                (bhumi_username, bhumi_email, password_hash, 1, 1)
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [seed for seed in SEED_USERS if seed[0] not in existing]
+            cursor.executemany(
+                'INSERT INTO users (username, email, password_hash, is_admin, is_active) VALUES (?, ?, ?, 1, 1) '
+                'ON CONFLICT DO NOTHING',
+                [(username, email, hash_password(password)) for username, email, password in missing]
             )
-            print(f"[SUCCESS] Created bhumi user with username: {bhumi_username}, password: {bhumi_password}")
-            
-            # Re-enable foreign key constraints
-            cursor.execute('PRAGMA foreign_keys = ON')
+            for username, _, password in missing:
+                print(f"[SUCCESS] Created {username} user with username: {username}, password: {password}")
             
             # Commit all changes
             conn.commit()
             
+            # Gather planner statistics in full when the composite indexes are first built,
+            # otherwise refresh only those PRAGMA optimize considers stale
+            cursor.execute('ANALYZE' if new_indexes else 'PRAGMA optimize')
+            
         except Exception as e:
             print(f"Error during database initialization: {e}")
             if conn:
@@ -258,13 +375,56 @@ def init_database():
 
 def hash_password(password):
     """
-    Hash a password using SHA-256
+    Hash a password using scrypt with a random salt
     Args:
         password (str): Plain text password
     Returns:
-        str: Hashed password
+        str: Hash in the form scrypt$n$r$p$salt$digest (hex salt and digest)
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+
+def is_legacy_hash(password_hash):
+    """
+    Check whether a stored hash predates scrypt (unsalted SHA-256)
+    Args:
+        password_hash (str): Stored password hash
+    Returns:
+        bool: True if the hash should be replaced on next successful login
+    """
+    return not password_hash.startswith("scrypt$")
+
+
+def verify_password(password, password_hash):
+    """
+    Check a password against a stored hash (scrypt, or legacy unsalted SHA-256)
+    Args:
+        password (str): Plain text password
+        password_hash (str): Stored password hash
+    Returns:
+        bool: True if the password matches
+    """
+    # Keyed BLAKE2b (stdlib, SIMD, no HMAC double pass) so plaintext passwords never sit in the cache
+    cache_key = (password_hash, hashlib.blake2b(password.encode(), key=_VERIFY_CACHE_KEY, digest_size=16).digest())
+    with _verify_cache_lock:
+        if cache_key in _verify_cache:
+            _verify_cache.move_to_end(cache_key)
+            return _verify_cache[cache_key]
+    
+    if is_legacy_hash(password_hash):
+        matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), password_hash)
+    else:
+        _, n, r, p, salt, digest = password_hash.split("$")
+        computed = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p))
+        matches = hmac.compare_digest(computed.hex(), digest)
+    
+    with _verify_cache_lock:
+        _verify_cache[cache_key] = matches
+        if len(_verify_cache) > VERIFY_CACHE_SIZE:
+            _verify_cache.popitem(last=False)
+    return matches
 
 
 def validate_email(email):
@@ -275,8 +435,7 @@ def validate_email(email):
     Returns:
         bool: True if valid, False otherwise
     """
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_RE.fullmatch(email) is not None
 
 
 def validate_username(username):
@@ -287,7 +446,7 @@ def validate_username(username):
     Returns:
         bool: True if valid, False otherwise
     """
-    return len(username) >= 3 and len(username) <= 20 and username.isalnum()
+    return USERNAME_RE.fullmatch(username) is not None
 
 
 def validate_password(password):
@@ -328,44 +487,39 @@ def register_user(username, email, password, is_admin=False):
     # Hash the password
     hashed_password = hash_password(password)
     
+    ensure_database()
+    
     # Connect to the database
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Check if username or email already exists
-        cursor.execute(
-            "SELECT id FROM users WHERE username = ? OR email = ?",
-            (username, email)
-        )
-        if cursor.fetchone() is not None:
-            return False, "Username or email already exists"
-        
-        # Set role
-        role = 'admin' if is_admin else 'user'
-        
-        # Insert new user
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)",
-            (username, email, hashed_password, is_admin)
-        )
-        
-        # Log the registration
-        user_id = cursor.lastrowid
-        cursor.execute(
-            "INSERT INTO user_activity (user_id, activity_type, activity_data) VALUES (?, ?, ?)",
-            (user_id, 'user_registered', f'New {role} account created')
-        )
+        activity_data, success_message = REGISTRATION_MESSAGES[bool(is_admin)]
         
-        conn.commit()
-        return True, f"{role.capitalize()} registration successful!"
-        conn.close()
-        return True, "Registration successful! Please login."
+        # Insert the user and log the registration in one transaction; a taken
+        # username or email makes the insert a no-op instead of raising
+        with conn:
+            cursor.execute(
+                "INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT DO NOTHING",
+                (username, email, hashed_password, is_admin)
+            )
+            if cursor.rowcount == 0:
+                return False, "Username or email already exists"
+            
+            user_id = cursor.lastrowid
+            cursor.execute(
+                "INSERT INTO user_activity (user_id, activity_type, activity_data) VALUES (?, ?, ?)",
+                (user_id, 'user_registered', activity_data)
+            )
+        return True, success_message
         
     except sqlite3.IntegrityError as e:
         return False, f"Database error: {str(e)}"
     except Exception as e:
         return False, f"An error occurred: {str(e)}"
+    finally:
+        conn.close()
 
 
 def authenticate_user(username, password):
@@ -379,9 +533,12 @@ def authenticate_user(username, password):
     """
     if not username or not password:
         return False, "Username and password are required", None
-        
+    
+    ensure_database()
     conn = get_db_connection()
     cursor = conn.cursor()
+    # Plain tuples: the known columns are unpacked, so no sqlite3.Row per lookup
+    cursor.row_factory = None
     
     try:
         # Get user by username
@@ -393,32 +550,38 @@ def authenticate_user(username, password):
         
         if user is None:
             return False, "Invalid username or password", None
+        user_id, username, email, password_hash, is_admin = user
             
         # Verify password
-        hashed_password = hash_password(password)
-        if user['password_hash'] != hashed_password:
+        if not verify_password(password, password_hash):
             return False, "Invalid username or password", None
             
-        # Update last login time
-        cursor.execute(
-            "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
-            (user['id'],)
-        )
-        
-        # Log the login activity
-        cursor.execute(
-            "INSERT INTO user_activity (user_id, activity_type) VALUES (?, ?)",
-            (user['id'], 'user_login')
-        )
-        
-        conn.commit()
+        # Update last login time and log the activity in one transaction
+        with conn:
+            # Upgrade a legacy SHA-256 hash to scrypt while the plain password is at hand
+            if is_legacy_hash(password_hash):
+                cursor.execute(
+                    "UPDATE users SET last_login = CURRENT_TIMESTAMP, password_hash = ? WHERE id = ?",
+                    (hash_password(password), user_id)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
+                    (user_id,)
+                )
+            
+            # Log the login activity
+            cursor.execute(
+                "INSERT INTO user_activity (user_id, activity_type) VALUES (?, ?)",
+                (user_id, 'user_login')
+            )
         
         # Return user data
         return True, "Login successful", {
-            'id': user['id'],
-            'username': user['username'],
-            'email': user['email'],
-            'is_admin': bool(user['is_admin'])
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'is_admin': bool(is_admin)
         }
         
     except sqlite3.Error as e:
@@ -436,9 +599,19 @@ def get_user_by_id(user_id):
     Returns:
         dict or None: User data if found, None otherwise
     """
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+        if cached is not None and cached[0] > now:
+            _user_cache.move_to_end(user_id)
+            return dict(cached[1])
+    
+    conn = None
     try:
+        ensure_database()
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.row_factory = None
         
         cursor.execute(
             "SELECT id, username, email FROM users WHERE id = ?",
@@ -446,22 +619,52 @@ def get_user_by_id(user_id):
         )
         
         user = cursor.fetchone()
-        conn.close()
         
+        # Misses are not cached, so a user registered afterwards is found straight away
         if user:
-            return {
-                "id": user["id"],
-                "username": user["username"],
-                "email": user["email"]
-            }
+            user = dict(zip(("id", "username", "email"), user))
+            with _user_cache_lock:
+                _user_cache[user_id] = (now + USER_CACHE_TTL, user)
+                _user_cache.move_to_end(user_id)
+                if len(_user_cache) > USER_CACHE_SIZE:
+                    _user_cache.popitem(last=False)
+            return dict(user)
         return None
         
     except Exception as e:
         print(f"Error fetching user: {str(e)}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 
-    # Initialize database when module is imported
-init_database()
-# Run migrations to ensure schema is up-to-date
-migrate_database()
+def ensure_database():
+    """
+    Create and migrate the schema unless the database is already at SCHEMA_VERSION.
+    Called by the public auth functions before their first query; after the first
+    call in a process it only checks a flag.
+    Returns:
+        bool: True if init/migrations ran, False if the schema was current
+    """
+    global _database_ready
+    if _database_ready:
+        return False
+    with _database_lock:
+        if _database_ready:
+            return False
+        
+        conn = get_db_connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        conn.close()
+        if version < SCHEMA_VERSION:
+            init_database()
+            # Run migrations to ensure schema is up-to-date
+            migrate_database()
+            
+            conn = get_db_connection()
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.close()
+        
+        _database_ready = True
+        return version < SCHEMA_VERSION
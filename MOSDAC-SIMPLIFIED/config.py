@@ -8,12 +8,19 @@ load_dotenv()
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Bump whenever pdf_processor's chunking changes, so saved indices are rebuilt
+CHUNKER_VERSION = 2
 MAX_TOKENS = 1000
 TEMPERATURE = 0.7
 
 # Persistence
 VECTOR_STORE_DIR = "data"
 VECTOR_STORE_NAME = "mosdac_vs"
+VECTOR_STORE_KEEP = 3  # indices kept for previous PDF versions, newest first
+EMBEDDING_CACHE_NAME = "embedding_cache.db"
+
+# Chat messages kept in the session and rendered (older ones stay in chat_history)
+CHAT_HISTORY_WINDOW = 20
 
 # Streamlit configuration
 PAGE_TITLE = "MOSDAC SIMPLIFIED"
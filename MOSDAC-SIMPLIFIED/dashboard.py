@@ -8,8 +8,11 @@ from datetime import datetime, timedelta
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from auth import get_db_connection
+from auth import get_db_connection, ensure_database
 import time
+import threading
+import queue
+import atexit
 import base64
 from io import BytesIO
 import json
@@ -17,11 +20,23 @@ from fpdf import FPDF
 import tempfile
 import os
 
+# Set once update_database_schema() has confirmed the users table is current
+_schema_ready = False
+
+# Role name shown for a users row
+USER_ROLE_SQL = "CASE WHEN is_admin THEN 'admin' ELSE 'user' END"
+
 # First, let's add the update_database_schema function
 def update_database_schema():
-    """Update database schema to include last_activity column if it doesn't exist"""
+    """Update database schema to include last_activity column if it doesn't exist.
+    Checked once per process; later calls return without touching the database."""
+    global _schema_ready
+    if _schema_ready:
+        return
     conn = None
     try:
+        # The users table must exist before it can be altered
+        ensure_database()
         conn = get_db_connection()
         cursor = conn.cursor()
         
@@ -83,6 +98,54 @@ def update_database_schema():
             
             conn.commit()
             print("✅ Database schema updated: Added last_activity column to users table")
+        
+        # Per-user chat counters live in their own narrow table, so logging a chat
+        # rewrites a three-column row instead of the whole users row
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='user_counters'")
+        if cursor.fetchone() is None:
+            with conn:
+                cursor.execute('''
+                    CREATE TABLE user_counters (
+                        user_id INTEGER PRIMARY KEY,
+                        total_queries INTEGER NOT NULL DEFAULT 0,
+                        last_activity TIMESTAMP
+                    )
+                ''')
+                # Carry over the counts kept on users until now
+                cursor.execute('''
+                    INSERT INTO user_counters (user_id, total_queries, last_activity)
+                    SELECT id, COALESCE(total_queries, 0), last_activity
+                    FROM users
+                    WHERE COALESCE(total_queries, 0) > 0
+                ''')
+            print("✅ Database schema updated: Added user_counters table")
+        
+        # Chat rows carry their author's username and role, so the admin's recent-chats
+        # list reads chat_history alone instead of joining users
+        cursor.execute("PRAGMA table_info(chat_history)")
+        chat_columns = [column[1] for column in cursor.fetchall()]
+        if 'username' not in chat_columns:
+            with conn:
+                cursor.execute('ALTER TABLE chat_history ADD COLUMN username TEXT')
+                cursor.execute('ALTER TABLE chat_history ADD COLUMN role TEXT')
+                cursor.execute(f'''
+                    UPDATE chat_history
+                    SET (username, role) = (
+                        SELECT username, {USER_ROLE_SQL} FROM users WHERE users.id = chat_history.user_id
+                    )
+                ''')
+            print("✅ Database schema updated: Added username and role columns to chat_history")
+        
+        # Query lengths are stored when a chat is logged, so the length breakdown is an
+        # index-only scan rather than a LENGTH() over every query text
+        if 'query_length' not in chat_columns:
+            with conn:
+                cursor.execute('ALTER TABLE chat_history ADD COLUMN query_length INTEGER')
+                cursor.execute('UPDATE chat_history SET query_length = LENGTH(query)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_query_length ON chat_history(query_length)')
+            print("✅ Database schema updated: Added query_length column to chat_history")
+        
+        _schema_ready = True
             
     except Exception as e:
         print(f"❌ Error updating database schema: {str(e)}")
@@ -99,9 +162,6 @@ def create_tables():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Enable foreign keys
-    cursor.execute("PRAGMA foreign_keys = ON")
-    
     # Create users table with last_activity column
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -124,6 +184,23 @@ def create_tables():
     conn.close()
     update_database_schema()  # Ensure schema is updated after creating tables
 
+# Count one chat for a user, creating their counters row on the first one; a user
+# that no longer exists matches nothing. Parameters: (user_id, timestamp, user_id)
+USER_COUNTERS_UPSERT = """
+    INSERT INTO user_counters (user_id, total_queries, last_activity)
+    SELECT ?, 1, ? WHERE EXISTS (SELECT 1 FROM users WHERE id = ?)
+    ON CONFLICT (user_id) DO UPDATE
+    SET total_queries = total_queries + 1, last_activity = excluded.last_activity
+"""
+
+# Log one chat with its author's username and role copied in; a user that no longer exists
+# inserts nothing. Parameters: (query, query_length, response, response_time_ms, timestamp, user_id)
+CHAT_HISTORY_INSERT = f"""
+    INSERT INTO chat_history (user_id, username, role, query, query_length, response, response_time_ms, timestamp)
+    SELECT id, username, {USER_ROLE_SQL}, ?, ?, ?, ?, ?
+    FROM users WHERE id = ?
+"""
+
 # Update the log_chat function
 def log_chat(user_id: int, query: str, response: str = None, response_time_ms: int = None) -> int:
     """Log chat history with optional response time and update query count.
@@ -142,36 +219,20 @@ def log_chat(user_id: int, query: str, response: str = None, response_time_ms: i
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # First, verify the user exists
-        cursor.execute('SELECT id, COALESCE(total_queries, 0) FROM users WHERE id = ?', (user_id,))
-        user_data = cursor.fetchone()
-        
-        if user_data is None:
-            raise ValueError(f"User with ID {user_id} not found")
-        
         # Get current timestamp
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        # Log the chat
-        cursor.execute(
-            """INSERT INTO chat_history 
-               (user_id, query, response, response_time_ms, timestamp) 
-               VALUES (?, ?, ?, ?, ?)""",
-            (user_id, query, response, response_time_ms, current_time)
-        )
+        # Update user's query count and last_activity, reading the new count back in the
+        # same statement; no row means the user doesn't exist
+        cursor.execute(USER_COUNTERS_UPSERT + " RETURNING total_queries", (user_id, current_time, user_id))
+        result = cursor.fetchone()
         
-        # Update user's query count and last_activity
-        cursor.execute('''
-            UPDATE users 
-            SET total_queries = COALESCE(total_queries, 0) + 1,
-                last_activity = ?
-            WHERE id = ?
-        ''', (current_time, user_id))
+        if result is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        new_count = result[0]
         
-        # Get the updated count
-        cursor.execute('SELECT COALESCE(total_queries, 0) FROM users WHERE id = ?', (user_id,))
-        result = cursor.fetchone()
-        new_count = result[0] if result else 0
+        # Log the chat
+        cursor.execute(CHAT_HISTORY_INSERT, (query, len(query), response, response_time_ms, current_time, user_id))
         
         # Commit the transaction
         conn.commit()
@@ -188,68 +249,110 @@ def log_chat(user_id: int, query: str, response: str = None, response_time_ms: i
         if conn:
             conn.close()
 
-# Update the get_user_analytics function
-def get_user_analytics():
-    """Get fresh analytics data for all users' queries"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.execute('PRAGMA read_uncommitted = 1')
-        
-        # Get user query statistics
-        user_stats_query = '''
-        SELECT 
-            u.id as user_id,
-            u.username,
-            u.email,
-            u.created_at,
-            COALESCE(u.total_queries, 0) as total_queries,
-            u.last_activity as last_query_time
-        FROM users u
-        ORDER BY COALESCE(u.total_queries, 0) DESC
-        '''
-        
-        user_stats = pd.read_sql_query(user_stats_query, conn)
-        
-        # Get daily trends
-        daily_trends_query = '''
-        SELECT 
-            DATE(timestamp) as query_date,
-            COUNT(*) as query_count
-        FROM chat_history
-        WHERE timestamp >= date('now', '-30 days')
-        GROUP BY DATE(timestamp)
-        ORDER BY query_date
-        '''
-        daily_trends = pd.read_sql_query(daily_trends_query, conn)
-        
-        # Get top users
-        top_users_query = '''
-        SELECT 
-            u.username,
-            COUNT(*) as query_count
-        FROM chat_history ch
-        JOIN users u ON ch.user_id = u.id
-        GROUP BY u.id, u.username
-        ORDER BY query_count DESC
-        LIMIT 10
-        '''
-        top_users = pd.read_sql_query(top_users_query, conn)
-        
-        return {
-            'user_stats': user_stats,
-            'daily_trends': daily_trends,
-            'top_users': top_users
-        }
+def get_recent_messages(user_id: int, limit: int) -> list:
+    """Return the user's most recent chat turns from chat_history as chat messages.
+    
+    Args:
+        user_id: The ID of the user
+        limit: Maximum number of messages (user and assistant) to return
         
-    except Exception as e:
-        st.error(f"Error fetching analytics: {str(e)}")
-        import traceback
-        st.error(traceback.format_exc())
-        return None
+    Returns:
+        list: Message dicts with 'role' and 'content', oldest first; only whole turns
+        are included, so the history never opens with an answer to a missing question
+    """
+    conn = get_db_connection()
+    try:
+        # Each row holds a question and, if answered, its answer: at least one message,
+        # so limit rows always cover limit messages
+        rows = conn.execute(
+            'SELECT query, response FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?',
+            (user_id, limit)
+        ).fetchall()
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+    
+    # Take whole turns, newest first, while they fit in limit
+    turns = []
+    count = 0
+    for row in rows:
+        turn = [{"role": "user", "content": row['query']}]
+        if row['response']:
+            turn.append({"role": "assistant", "content": row['response']})
+        if count + len(turn) > limit:
+            break
+        turns.append(turn)
+        count += len(turn)
+    return [message for turn in reversed(turns) for message in turn]
+
+# Background chat logging: rows are queued and written in batches off the request path
+# The interval bounds latency when idle; the batch size only matters under bursts
+CHAT_LOG_BATCH_SIZE = 128
+CHAT_LOG_FLUSH_INTERVAL = 0.1  # seconds to wait for more rows before writing a batch
+_chat_log_queue = queue.Queue()
+_chat_log_thread = None
+_chat_log_lock = threading.Lock()
+
+def _write_chat_batch(batch: list):
+    """Insert queued chats and bump their users' counters in one transaction"""
+    conn = get_db_connection()
+    try:
+        with conn:
+            # Chats for users deleted since they were queued are dropped
+            conn.executemany(
+                CHAT_HISTORY_INSERT,
+                [(query, len(query), response, response_time_ms, ts, user_id)
+                 for user_id, query, response, response_time_ms, ts in batch]
+            )
+            conn.executemany(
+                USER_COUNTERS_UPSERT,
+                [(user_id, ts, user_id) for user_id, _, _, _, ts in batch]
+            )
+    finally:
+        conn.close()
+
+def _drain_chat_log():
+    """Writer thread: collect up to CHAT_LOG_BATCH_SIZE rows or CHAT_LOG_FLUSH_INTERVAL, then write"""
+    while True:
+        batch = [_chat_log_queue.get()]
+        deadline = time.monotonic() + CHAT_LOG_FLUSH_INTERVAL
+        while len(batch) < CHAT_LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_chat_log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            _write_chat_batch(batch)
+        except Exception as e:
+            print(f"Error writing chat log batch: {e}")
+
+@atexit.register
+def _flush_chat_log():
+    """Write whatever is still queued when the process exits"""
+    batch = []
+    while True:
+        try:
+            batch.append(_chat_log_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        _write_chat_batch(batch)
+
+def log_chat_async(user_id: int, query: str, response: str = None, response_time_ms: int = None):
+    """Queue a chat for the background writer and return immediately.
+    
+    Same columns as log_chat, but without the round-trips on the caller's thread;
+    the user's total_queries is incremented when the batch is written.
+    """
+    global _chat_log_thread
+    with _chat_log_lock:
+        if _chat_log_thread is None:
+            _chat_log_thread = threading.Thread(target=_drain_chat_log, name="chat-log-writer", daemon=True)
+            _chat_log_thread.start()
+    _chat_log_queue.put((user_id, query, response, response_time_ms,
+                         datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
 
 def log_activity(user_id: int, activity_type: str, activity_data: str = None):
     """Log user activity to the database"""
@@ -262,15 +365,13 @@ def log_activity(user_id: int, activity_type: str, activity_data: str = None):
     conn.commit()
     conn.close()
 
-def get_user_analytics():
-    """Get fresh analytics data for all users' queries"""
-    conn = None
+def get_user_analytics(conn: sqlite3.Connection = None):
+    """Get fresh analytics data for all users' queries.
+    Runs on conn when given (left open), otherwise on a connection of its own."""
+    own_conn = conn is None
     try:
-        # Force a new connection to get fresh data
-        conn = get_db_connection()
-        
-        # Ensure we're not using a cached connection
-        conn.execute('PRAGMA read_uncommitted = 1')
+        if own_conn:
+            conn = get_db_connection()
         
         # Get user query statistics with the most recent data
         user_stats_query = '''
@@ -279,10 +380,10 @@ def get_user_analytics():
             u.username,
             u.email,
             u.created_at,
-            COALESCE(u.total_queries, 0) as total_queries,
-            u.last_activity as last_query_time
+            COALESCE(uc.total_queries, 0) as total_queries,
+            COALESCE(uc.last_activity, u.last_activity) as last_query_time
         FROM users u
-        ORDER BY COALESCE(u.total_queries, 0) DESC
+        LEFT JOIN user_counters uc ON uc.user_id = u.id
         '''
         
         user_stats = pd.read_sql_query(user_stats_query, conn)
@@ -324,7 +425,7 @@ def get_user_analytics():
         st.error(traceback.format_exc())
         return None
     finally:
-        if conn:
+        if own_conn and conn:
             conn.close()
 
 def get_user_stats(user_id: int) -> dict:
@@ -334,7 +435,7 @@ def get_user_stats(user_id: int) -> dict:
     
     # Get user info
     user = cursor.execute(
-        "SELECT username, role, last_login FROM users WHERE id = ?", 
+        f"SELECT username, {USER_ROLE_SQL} AS role, last_login FROM users WHERE id = ?", 
         (user_id,)
     ).fetchone()
     
@@ -344,12 +445,13 @@ def get_user_stats(user_id: int) -> dict:
         (user_id,)
     ).fetchone()[0]
     
-    # Get recent activities
+    # Get recent activities (user_activity has a single timestamp column; the
+    # created_at alias is what the profile view reads)
     recent_activities = cursor.execute(
-        "SELECT activity_type, activity_data, created_at "
+        "SELECT activity_type, activity_data, timestamp AS created_at "
         "FROM user_activity "
         "WHERE user_id = ? "
-        "ORDER BY created_at DESC "
+        "ORDER BY timestamp DESC "
         "LIMIT 5",
         (user_id,)
     ).fetchall()
@@ -358,10 +460,16 @@ def get_user_stats(user_id: int) -> dict:
     
     return {
         'username': user['username'],
+        'role': user['role'],
+        'last_login': user['last_login'],
         'query_count': query_count,
         'recent_activities': recent_activities
     }
 
+# Rows per pandas chunk when reading per-user analytics, so the raw result rows
+# are never all held in Python alongside the finished DataFrame
+ANALYTICS_READ_CHUNK_SIZE = 5000
+
 def get_analytics_data():
     """Get analytics data for the admin dashboard"""
     conn = get_db_connection()
@@ -377,30 +485,28 @@ def get_analytics_data():
         'SELECT AVG(response_time_ms)/1000.0 FROM chat_history WHERE response_time_ms IS NOT NULL'
     ).fetchone()[0] or 0
     
-    # Get user activity data
-    user_activity = pd.read_sql(
-        """
+    # Get user activity data, read in chunks with the timestamps parsed per chunk
+    user_activity_chunks = pd.read_sql(
+        f"""
         SELECT 
             u.id as user_id,
             u.username,
             u.email,
-            u.role,
+            {USER_ROLE_SQL} AS role,
             u.last_login,
             COUNT(ch.id) as total_queries,
             MAX(ch.timestamp) as last_active_date,
             AVG(ch.response_time_ms)/1000.0 as average_response_time
         FROM users u
         LEFT JOIN chat_history ch ON u.id = ch.user_id
-        GROUP BY u.id, u.username, u.email, u.role, u.last_login
+        GROUP BY u.id, u.username, u.email, u.last_login
         ORDER BY total_queries DESC
         """,
-        conn
+        conn,
+        parse_dates=['last_active_date', 'last_login'],
+        chunksize=ANALYTICS_READ_CHUNK_SIZE
     )
-    
-    # Convert timestamp to datetime
-    if not user_activity.empty:
-        user_activity['last_active_date'] = pd.to_datetime(user_activity['last_active_date'])
-        user_activity['last_login'] = pd.to_datetime(user_activity['last_login'])
+    user_activity = pd.concat(user_activity_chunks, ignore_index=True)
     
     conn.close()
     
@@ -423,18 +529,18 @@ def get_admin_stats():
     total_questions = cursor.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0]
     
     # Get user activity with more details
-    user_activity = cursor.execute("""
+    user_activity = cursor.execute(f"""
         SELECT 
             u.id, 
             u.username, 
             u.email,
-            u.role,
+            {USER_ROLE_SQL} AS role,
             u.created_at,
             u.last_login,
             COUNT(c.id) as query_count 
         FROM users u 
         LEFT JOIN chat_history c ON u.id = c.user_id 
-        GROUP BY u.id, u.username, u.email, u.role, u.created_at, u.last_login
+        GROUP BY u.id, u.username, u.email, u.created_at, u.last_login
         ORDER BY u.created_at DESC
     """).fetchall()
     
@@ -444,32 +550,31 @@ def get_admin_stats():
     
     # Get recent chat history with more details
     if 'timestamp' in columns:
+        # Newest first by rowid, which follows insertion order, so this reads the last 20 rows
         recent_chats = cursor.execute("""
             SELECT 
-                u.username, 
-                u.role,
-                c.query, 
-                c.response, 
-                c.timestamp,
-                c.id as chat_id
-            FROM chat_history c 
-            JOIN users u ON c.user_id = u.id 
-            ORDER BY c.timestamp DESC 
+                username, 
+                role,
+                query, 
+                response, 
+                timestamp,
+                id as chat_id
+            FROM chat_history 
+            ORDER BY id DESC 
             LIMIT 20
         """).fetchall()
     else:
         # Fallback if timestamp column doesn't exist
         recent_chats = cursor.execute("""
             SELECT 
-                u.username, 
-                u.role,
-                c.query, 
-                c.response, 
+                username, 
+                role,
+                query, 
+                response, 
                 datetime('now') as timestamp,
-                c.id as chat_id
-            FROM chat_history c 
-            JOIN users u ON c.user_id = u.id 
-            ORDER BY c.id DESC 
+                id as chat_id
+            FROM chat_history 
+            ORDER BY id DESC 
             LIMIT 20
         """).fetchall()
     
@@ -489,7 +594,8 @@ def get_table_download_link(df, filename, button_text):
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='Analytics')
-    b64 = base64.b64encode(output.getvalue()).decode()
+    # Encode straight from the buffer rather than from a bytes copy of it
+    b64 = base64.b64encode(output.getbuffer()).decode()
     href = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}">'
     href += f'<button style="background-color: #4CAF50; color: white; padding: 8px 16px; border: none; border-radius: 4px; cursor: pointer;">'
     href += f'{button_text}</button></a>'
@@ -558,11 +664,12 @@ def generate_pdf(df, title):
             pdf.cell(col_width, 10, str(header), 1)
         pdf.ln()
         
-        # Data
+        # Data: every cell converted to text in one pass, missing values left blank
+        cells = df_display.astype(object).where(df_display.notna(), '').astype(str).to_numpy()
         pdf.set_font('Arial', '', 8)
-        for _, row in df_display.iterrows():
-            for header in headers:
-                pdf.cell(col_width, 10, str(row[header]) if pd.notnull(row[header]) else '', 1)
+        for row in cells:
+            for cell in row:
+                pdf.cell(col_width, 10, cell, 1)
             pdf.ln()
     
     # Save to temp file
@@ -595,11 +702,16 @@ def show_user_dashboard(user_id: int):
     else:
         st.info("No recent activities found.")
 
-def get_advanced_analytics():
-    """Get comprehensive analytics data including response times, engagement, and patterns"""
-    conn = None
+# Weekday names in strftime('%w') order
+WEEKDAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+def get_advanced_analytics(conn: sqlite3.Connection = None):
+    """Get comprehensive analytics data including response times, engagement, and patterns.
+    Runs on conn when given (left open), otherwise on a connection of its own."""
+    own_conn = conn is None
     try:
-        conn = get_db_connection()
+        if own_conn:
+            conn = get_db_connection()
         
         # Response Time Analytics
         response_time_query = '''
@@ -613,19 +725,39 @@ def get_advanced_analytics():
         '''
         response_stats = pd.read_sql_query(response_time_query, conn)
         
-        # Response time trends over time
-        response_trends_query = '''
+        # Last 30 days in one pass, one row per (date, hour); the response time trends and
+        # the hourly and weekday usage are all rolled up from it below
+        recent_window_query = '''
         SELECT 
             DATE(timestamp) as date,
-            AVG(response_time_ms) as avg_response_time,
-            COUNT(*) as query_count
+            CAST(strftime('%H', timestamp) AS INTEGER) as hour,
+            COUNT(*) as query_count,
+            COUNT(response_time_ms) as timed_count,
+            SUM(response_time_ms) as response_time_total
         FROM chat_history
-        WHERE response_time_ms IS NOT NULL
-            AND timestamp >= date('now', '-30 days')
-        GROUP BY DATE(timestamp)
-        ORDER BY date
+        WHERE timestamp >= date('now', '-30 days')
+        GROUP BY date, hour
         '''
-        response_trends = pd.read_sql_query(response_trends_query, conn)
+        recent_window = pd.read_sql_query(recent_window_query, conn)
+        
+        # Response time trends over time
+        timed = recent_window[recent_window['timed_count'] > 0]
+        response_trends = timed.groupby('date', as_index=False)[['response_time_total', 'timed_count']].sum()
+        response_trends['avg_response_time'] = response_trends['response_time_total'] / response_trends['timed_count']
+        response_trends = response_trends.rename(columns={'timed_count': 'query_count'})[
+            ['date', 'avg_response_time', 'query_count']
+        ]
+        
+        # Peak Usage Times - Hourly
+        hourly_usage = recent_window.groupby('hour', as_index=False)['query_count'].sum()
+        
+        # Day of week usage, Sunday first as strftime('%w') numbers them
+        weekday = (pd.to_datetime(recent_window['date']).dt.dayofweek + 1) % 7
+        daily_usage = recent_window.groupby(weekday)['query_count'].sum().sort_index()
+        daily_usage = pd.DataFrame({
+            'day_of_week': daily_usage.index.map(dict(enumerate(WEEKDAY_NAMES))),
+            'query_count': daily_usage.to_numpy()
+        })
         
         # User Engagement Metrics
         engagement_query = '''
@@ -638,48 +770,22 @@ def get_advanced_analytics():
         '''
         engagement_stats = pd.read_sql_query(engagement_query, conn)
         
-        # Query Length Distribution
-        query_length_query = '''
+        # Query Categories (based on length), bucketed in SQL so only one row per category comes back
+        query_category_query = '''
         SELECT 
-            LENGTH(query) as query_length,
+            CASE
+                WHEN query_length <= 50 THEN 'Short (<50)'
+                WHEN query_length <= 100 THEN 'Medium (50-100)'
+                WHEN query_length <= 200 THEN 'Long (100-200)'
+                ELSE 'Very Long (>200)'
+            END as category,
             COUNT(*) as count
         FROM chat_history
-        GROUP BY LENGTH(query)
-        ORDER BY query_length
-        '''
-        query_lengths = pd.read_sql_query(query_length_query, conn)
-        
-        # Peak Usage Times - Hourly
-        hourly_usage_query = '''
-        SELECT 
-            CAST(strftime('%H', timestamp) AS INTEGER) as hour,
-            COUNT(*) as query_count
-        FROM chat_history
-        WHERE timestamp >= date('now', '-30 days')
-        GROUP BY hour
-        ORDER BY hour
+        WHERE query_length > 0
+        GROUP BY category
+        ORDER BY MIN(query_length)
         '''
-        hourly_usage = pd.read_sql_query(hourly_usage_query, conn)
-        
-        # Day of week usage
-        daily_usage_query = '''
-        SELECT 
-            CASE CAST(strftime('%w', timestamp) AS INTEGER)
-                WHEN 0 THEN 'Sunday'
-                WHEN 1 THEN 'Monday'
-                WHEN 2 THEN 'Tuesday'
-                WHEN 3 THEN 'Wednesday'
-                WHEN 4 THEN 'Thursday'
-                WHEN 5 THEN 'Friday'
-                WHEN 6 THEN 'Saturday'
-            END as day_of_week,
-            COUNT(*) as query_count
-        FROM chat_history
-        WHERE timestamp >= date('now', '-30 days')
-        GROUP BY strftime('%w', timestamp)
-        ORDER BY CAST(strftime('%w', timestamp) AS INTEGER)
-        '''
-        daily_usage = pd.read_sql_query(daily_usage_query, conn)
+        query_categories = pd.read_sql_query(query_category_query, conn)
         
         # User Segmentation - New vs Returning
         user_segmentation_query = '''
@@ -691,7 +797,7 @@ def get_advanced_analytics():
             MIN(ch.timestamp) as first_query,
             MAX(ch.timestamp) as last_query,
             CASE 
-                WHEN julianday('now') - julianday(u.created_at) <= 7 THEN 'New'
+                WHEN u.created_at >= datetime('now', '-7 days') THEN 'New'
                 WHEN COUNT(ch.id) >= 10 THEN 'Power User'
                 WHEN MAX(ch.timestamp) >= date('now', '-7 days') THEN 'Active'
                 ELSE 'Inactive'
@@ -713,21 +819,10 @@ def get_advanced_analytics():
         '''
         user_growth = pd.read_sql_query(user_growth_query, conn)
         
-        # Query Categories (based on length)
-        query_categories = query_lengths.copy()
-        if not query_categories.empty:
-            query_categories['category'] = pd.cut(
-                query_categories['query_length'],
-                bins=[0, 50, 100, 200, float('inf')],
-                labels=['Short (<50)', 'Medium (50-100)', 'Long (100-200)', 'Very Long (>200)']
-            )
-            query_categories = query_categories.groupby('category', observed=True)['count'].sum().reset_index()
-        
         return {
             'response_stats': response_stats,
             'response_trends': response_trends,
             'engagement_stats': engagement_stats,
-            'query_lengths': query_lengths,
             'query_categories': query_categories,
             'hourly_usage': hourly_usage,
             'daily_usage': daily_usage,
@@ -741,33 +836,108 @@ def get_advanced_analytics():
         st.error(traceback.format_exc())
         return None
     finally:
-        if conn:
+        if own_conn and conn:
             conn.close()
 
+def load_analytics_bundle():
+    """Run every query behind the analytics dashboard on one pooled connection.
+    Returns None if either analytics group failed (the error is already shown)."""
+    conn = get_db_connection()
+    try:
+        analytics = get_user_analytics(conn)
+        advanced_analytics = get_advanced_analytics(conn)
+        if analytics is None or advanced_analytics is None:
+            return None
+        
+        # Per-user details, shown in the user table and exported
+        user_details_query = '''
+        SELECT 
+            u.id,
+            u.username,
+            u.email,
+            u.last_login,
+            COALESCE(uc.total_queries, 0) as total_queries,
+            COALESCE(uc.last_activity, u.last_activity) as last_activity,
+            u.created_at
+        FROM users u
+        LEFT JOIN user_counters uc ON uc.user_id = u.id
+        '''
+        # Busiest users first, sorted once here rather than by SQLite on every reload
+        user_details = pd.read_sql_query(
+            user_details_query, conn, parse_dates=['last_login', 'last_activity', 'created_at']
+        ).sort_values(
+            'total_queries', ascending=False, kind='stable', ignore_index=True
+        )
+        
+        # Get query history summary
+        query_summary = '''
+        SELECT 
+            u.username,
+            COUNT(ch.id) as query_count,
+            AVG(ch.response_time_ms) as avg_response_time,
+            MIN(ch.timestamp) as first_query,
+            MAX(ch.timestamp) as last_query
+        FROM users u
+        LEFT JOIN chat_history ch ON u.id = ch.user_id
+        GROUP BY u.id, u.username
+        ORDER BY query_count DESC
+        '''
+        query_data = pd.read_sql_query(query_summary, conn)
+    finally:
+        conn.close()
+    
+    return {
+        'analytics': analytics,
+        'advanced_analytics': advanced_analytics,
+        'user_details': user_details,
+        'query_summary': query_data,
+        'loaded_at': pd.Timestamp.now()
+    }
+
+# Seconds a loaded analytics bundle may be reused while no chats or users are added
+ANALYTICS_CACHE_TTL = 30
+
+def _analytics_data_version() -> tuple:
+    """Cheap fingerprint of the analytics inputs; changes when a chat is logged or a user is added/removed"""
+    conn = get_db_connection()
+    try:
+        # MAX() on the rowid is a single B-tree seek
+        return tuple(conn.execute(
+            """SELECT (SELECT COALESCE(MAX(id), 0) FROM chat_history),
+                      (SELECT COALESCE(MAX(id), 0) FROM users),
+                      (SELECT COUNT(*) FROM users)"""
+        ).fetchone())
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=ANALYTICS_CACHE_TTL, show_spinner=False)
+def cached_analytics_bundle(data_version: tuple):
+    """load_analytics_bundle(), memoized on the data version from _analytics_data_version()"""
+    return load_analytics_bundle()
+
 def show_analytics_dashboard():
     """Display enhanced analytics dashboard with comprehensive metrics"""    
     
-    # Clear any cached data
-    if 'analytics_data' in st.session_state:
-        del st.session_state.analytics_data
+    # Last update time, filled in once the data is loaded
+    last_updated = st.empty()
     
-    # Show last update time
-    current_time = pd.Timestamp.now()
-    st.caption(f"Last updated: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Add refresh button
+    # Add refresh button; it bypasses the cached bundle
     if st.button("🔄 Refresh Data"):
+        cached_analytics_bundle.clear()
         st.rerun()
     
-    # Get fresh analytics data
+    # Get analytics data: reused while nothing changed, reloaded after new chats or users
     try:
-        # Force a fresh data load
-        analytics = get_user_analytics()
-        advanced_analytics = get_advanced_analytics()
+        bundle = cached_analytics_bundle(_analytics_data_version())
         
-        if analytics is None or advanced_analytics is None:
+        if bundle is None:
+            # Don't keep serving the failure from the cache
+            cached_analytics_bundle.clear()
             st.error("❌ Failed to load analytics data. Please try again.")
             return
+        last_updated.caption(f"Last updated: {bundle['loaded_at'].strftime('%Y-%m-%d %H:%M:%S')}")
+        analytics = bundle['analytics']
+        advanced_analytics = bundle['advanced_analytics']
         
         if not analytics or 'user_stats' not in analytics or analytics['user_stats'].empty:
             st.info("ℹ️ No query data available yet. Start chatting to see analytics.")
@@ -801,72 +971,55 @@ def show_analytics_dashboard():
         # ===== USER TABLE SECTION =====
         st.header("👥 User Statistics Table")
         if not user_stats.empty:
-            # Get additional user info from database
-            conn = get_db_connection()
-            try:
-                user_details_query = '''
-                SELECT 
-                    u.id,
-                    u.username,
-                    u.email,
-                    u.last_login,
-                    COALESCE(u.total_queries, 0) as total_queries,
-                    u.last_activity
-                FROM users u
-                ORDER BY COALESCE(u.total_queries, 0) DESC
-                '''
-                user_details = pd.read_sql_query(user_details_query, conn)
+            # Additional user info, loaded with the rest of the bundle
+            user_details = bundle['user_details']
+            if not user_details.empty:
+                # Format the display dataframe
+                display_df = user_details[['username', 'email', 'last_login', 'total_queries', 'last_activity']].copy()
+                display_df.columns = ['Username', 'Email', 'Last Login', 'Total Queries', 'Last Activity']
                 
-                if not user_details.empty:
-                    # Format the display dataframe
-                    display_df = user_details[['username', 'email', 'last_login', 'total_queries', 'last_activity']].copy()
-                    display_df.columns = ['Username', 'Email', 'Last Login', 'Total Queries', 'Last Activity']
-                    
-                    # Format datetime columns
-                    for col in ['Last Login', 'Last Activity']:
-                        if col in display_df.columns:
-                            display_df[col] = pd.to_datetime(display_df[col]).dt.strftime('%Y-%m-%d %H:%M')
-                    
-                    # Display the table with enhanced styling
-                    st.dataframe(
-                        display_df,
-                        column_config={
-                            "Username": st.column_config.TextColumn(
-                                "Username",
-                                help="User's username",
-                                width="medium"
-                            ),
-                            "Email": st.column_config.TextColumn(
-                                "Email",
-                                help="User's email address",
-                                width="large"
-                            ),
-                            "Last Login": st.column_config.TextColumn(
-                                "Last Login",
-                                help="Last login timestamp",
-                                width="medium"
-                            ),
-                            "Total Queries": st.column_config.NumberColumn(
-                                "Total Queries",
-                                help="Number of queries asked by the user",
-                                format="%d",
-                                width="small"
-                            ),
-                            "Last Activity": st.column_config.TextColumn(
-                                "Last Activity",
-                                help="Last activity timestamp",
-                                width="medium"
-                            )
-                        },
-                        use_container_width=True,
-                        hide_index=True,
-                        height=400
-                    )
-                    
-                else:
-                    st.info("No user data available.")
-            finally:
-                conn.close()
+                # Format datetime columns (already parsed when the bundle was loaded)
+                datetime_cols = ['Last Login', 'Last Activity']
+                display_df[datetime_cols] = display_df[datetime_cols].apply(lambda s: s.dt.strftime('%Y-%m-%d %H:%M'))
+                
+                # Display the table with enhanced styling
+                st.dataframe(
+                    display_df,
+                    column_config={
+                        "Username": st.column_config.TextColumn(
+                            "Username",
+                            help="User's username",
+                            width="medium"
+                        ),
+                        "Email": st.column_config.TextColumn(
+                            "Email",
+                            help="User's email address",
+                            width="large"
+                        ),
+                        "Last Login": st.column_config.TextColumn(
+                            "Last Login",
+                            help="Last login timestamp",
+                            width="medium"
+                        ),
+                        "Total Queries": st.column_config.NumberColumn(
+                            "Total Queries",
+                            help="Number of queries asked by the user",
+                            format="%d",
+                            width="small"
+                        ),
+                        "Last Activity": st.column_config.TextColumn(
+                            "Last Activity",
+                            help="Last activity timestamp",
+                            width="medium"
+                        )
+                    },
+                    use_container_width=True,
+                    hide_index=True,
+                    height=400
+                )
+                
+            else:
+                st.info("No user data available.")
         else:
             st.info("No user statistics available.")
         
@@ -951,37 +1104,9 @@ def show_analytics_dashboard():
         
         # ===== EXPORT COMPLETE STATISTICS =====        
         try:
-            # Get user details again for export
-            conn = get_db_connection()
-            user_details_query = '''
-            SELECT 
-                u.id,
-                u.username,
-                u.email,
-                u.last_login,
-                COALESCE(u.total_queries, 0) as total_queries,
-                u.last_activity,
-                u.created_at
-            FROM users u
-            ORDER BY COALESCE(u.total_queries, 0) DESC
-            '''
-            complete_user_data = pd.read_sql_query(user_details_query, conn)
-            
-            # Get query history summary
-            query_summary = '''
-            SELECT 
-                u.username,
-                COUNT(ch.id) as query_count,
-                AVG(ch.response_time_ms) as avg_response_time,
-                MIN(ch.timestamp) as first_query,
-                MAX(ch.timestamp) as last_query
-            FROM users u
-            LEFT JOIN chat_history ch ON u.id = ch.user_id
-            GROUP BY u.id, u.username
-            ORDER BY query_count DESC
-            '''
-            query_data = pd.read_sql_query(query_summary, conn)
-            conn.close()
+            # User details and query summary come from the same bundle as the charts
+            complete_user_data = bundle['user_details']
+            query_data = bundle['query_summary']
             
             # Create Excel file with multiple sheets
             output = BytesIO()
@@ -1,181 +1,7 @@
 import streamlit as st
+from collections import deque
 from auth import register_user, authenticate_user
-
-
-def apply_auth_styles():
-    """
-    Apply custom CSS styles for authentication pages with dark theme
-    """
-    st.markdown("""
-    <style>
-        /* Import Google Fonts */
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-        
-        /* Dark Theme Variables */
-        :root {
-            --primary: #7c4dff;
-            --primary-dark: #651fff;
-            --secondary: #1e1e2d;
-            --dark: #121212;
-            --darker: #0a0a0a;
-            --light: #e0e0e0;
-            --text: #ffffff;
-            --text-secondary: #b0b0b0;
-        }
-        
-        /* Base Styles */
-        .stApp {
-            background: var(--darker) !important;
-            color: var(--text) !important;
-        }
-        
-        .main {
-            font-family: 'Inter', sans-serif;
-            background: var(--darker) !important;
-            color: var(--text) !important;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        /* Auth Container */
-        .auth-container {
-            max-width: 700px;
-            width: 95%;
-            margin: 2rem auto;
-            padding: 2.5rem 3rem;
-            background: var(--secondary);
-            border-radius: 24px;
-            box-shadow: 0 25px 80px rgba(0, 0, 0, 0.4);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        /* Auth Header */
-        .auth-header {
-            text-align: center;
-            margin-bottom: 2rem;
-        }
-        
-        .auth-header h1 {
-            color: var(--primary);
-            font-size: 2.75rem;
-            font-weight: 700;
-            margin-bottom: 0.75rem;
-            letter-spacing: -0.5px;
-        }
-        
-        .auth-header p {
-            color: var(--text-secondary);
-            font-size: 1.1rem;
-            font-weight: 400;
-            line-height: 1.6;
-            margin-bottom: 2rem !important;
-        }
-        
-        /* Input Fields */
-        .stTextInput > div > div > input {
-            border-radius: 14px;
-            border: 2px solid rgba(255, 255, 255, 0.1);
-            background-color: var(--dark) !important;
-            color: var(--text) !important;
-            padding: 0.75rem 1rem;
-            font-size: 1rem;
-            transition: all 0.3s ease;
-            height: auto;
-            min-height: 48px;
-            margin-bottom: 1rem;
-        }
-
-        .stTextInput > div > div > input:focus {
-            border-color: var(--primary);
-            box-shadow: 0 0 0 4px rgba(124, 77, 255, 0.2);
-            transform: translateY(-1px);
-        }
-        
-        .stTextInput > div > div > input:hover {
-            border-color: rgba(255, 255, 255, 0.2);
-        }
-        
-        .stTextInput > label {
-            font-size: 1.05rem !important;
-            font-weight: 500 !important;
-            margin-bottom: 0.5rem !important;
-            color: var(--text) !important;
-        }
-        
-        /* Buttons */
-        .stButton > button {
-            width: 100%;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%) !important;
-            color: white !important;
-            border: none !important;
-            border-radius: 14px;
-            padding: 1rem 2rem !important;
-            font-size: 1.1rem !important;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease !important;
-            height: auto !important;
-            min-height: 56px;
-            margin-top: 0.5rem;
-            margin-bottom: 1.5rem;
-            box-shadow: 0 4px 15px rgba(124, 77, 255, 0.3);
-        }
-        
-        .stButton > button:hover {
-            transform: translateY(-3px) scale(1.01);
-            box-shadow: 0 15px 30px rgba(0, 0, 0, 0.3) !important;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%) !important;
-        }
-        
-        .stButton > button:active {
-            transform: translateY(0) scale(0.99);
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.2) !important;
-        }
-        
-        /* Success/Error Messages */
-        .stSuccess, .stError, .stWarning, .stInfo {
-            border-radius: 12px;
-            padding: 1rem;
-            margin: 1rem 0;
-            background-color: rgba(0, 0, 0, 0.2) !important;
-        }
-        
-        /* Link Styles */
-        .auth-link {
-            text-align: center;
-            margin: 2rem 0 1.5rem;
-            color: var(--text-secondary);
-            font-size: 1.05rem;
-            line-height: 1.6;
-        }
-        
-        .auth-link a {
-            color: var(--primary) !important;
-            text-decoration: none;
-            font-weight: 500;
-            transition: all 0.2s ease;
-        }
-        
-        .auth-link a:hover {
-            color: var(--primary-dark) !important;
-            text-decoration: underline;
-        }
-        
-        /* Hide Streamlit branding */
-        #MainMenu {visibility: hidden;}
-        footer {visibility: hidden;}
-        
-        /* Divider */
-        .divider {
-            text-align: center;
-            margin: 1rem 0;
-            color: var(--text-secondary);
-            font-size: 0.95rem;
-        }
-    </style>
-    """, unsafe_allow_html=True)
+from config import CHAT_HISTORY_WINDOW
 
 
 def show_signup_page():
@@ -183,8 +9,6 @@ def show_signup_page():
     Display the signup page with form validation
     Allows new users to register with username, email, and password
     """
-    apply_auth_styles()
-    
     # Center the form with full width
     col1, col2, col3 = st.columns([0.5, 9, 0.5])
     
@@ -275,8 +99,6 @@ def show_login_page():
     Display the login page with authentication
     Allows existing users to log in with username and password
     """
-    apply_auth_styles()
-    
     # Center the form with full width
     col1, col2, col3 = st.columns([0.5, 9, 0.5])
     
@@ -329,9 +151,11 @@ def show_login_page():
                         # Set page to chat
                         st.session_state.page = "chat"
                         
-                        # Clear any previous messages
-                        if 'messages' not in st.session_state:
-                            st.session_state.messages = []
+                        # Restore the tail of the user's saved conversation
+                        from dashboard import get_recent_messages
+                        st.session_state.messages = deque(
+                            get_recent_messages(user_data["id"], CHAT_HISTORY_WINDOW), maxlen=CHAT_HISTORY_WINDOW
+                        )
                         
                         # Rerun to update the UI
                         st.rerun()
@@ -1,8 +1,42 @@
-import PyPDF2
+import fitz  # PyMuPDF
 import os
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Tuple, Iterator
 import streamlit as st
 
+# Upper bound on extraction worker processes
+MAX_EXTRACT_WORKERS = 4
+# Pages per extraction task when streaming chunks, and tasks kept in flight per worker
+STREAM_PAGES_PER_TASK = 8
+STREAM_TASKS_PER_WORKER = 2
+
+
+def _extract_workers(num_pages: int) -> int:
+    """Number of extraction processes worth starting for a document of num_pages"""
+    return max(1, min(os.cpu_count() or 1, MAX_EXTRACT_WORKERS, num_pages))
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract text for pages [start, stop) - module level so worker processes can pickle it"""
+    with fitz.open(pdf_path) as doc:
+        return [(page_num, doc[page_num].get_text("text")) for page_num in range(start, stop)]
+
+
+def _page_chunks(page_number: int, page_text: str, chunk_size: int, overlap: int) -> Iterator[str]:
+    """Yield overlapping fixed-size character chunks of one page, tagged with its page number"""
+    page_text = " ".join(page_text.split())
+    if not page_text:
+        return
+    step = max(1, chunk_size - overlap)
+    # Further split large pages into overlapping fixed-size chunks
+    for j in range(0, max(1, len(page_text) - overlap), step):
+        chunk = page_text[j:j + chunk_size].strip()
+        if chunk:
+            yield f"Page {page_number}: {chunk}"
+
+
 class PDFProcessor:
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
@@ -12,20 +46,32 @@ class PDFProcessor:
     def extract_text(self) -> str:
         """Extract text from PDF file"""
         try:
-            with open(self.pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    self.pages.append({
-                        'page_number': page_num + 1,
-                        'text': page_text
-                    })
-                    text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
-                
-                self.text = text
-                return text
+            with fitz.open(self.pdf_path) as doc:
+                num_pages = doc.page_count
+            
+            # Give each worker a contiguous page range so it parses the PDF only once
+            workers = _extract_workers(num_pages)
+            bounds = [num_pages * i // workers for i in range(workers + 1)]
+            if workers == 1:
+                extracted = _extract_page_range(self.pdf_path, 0, num_pages)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(_extract_page_range, self.pdf_path, bounds[i], bounds[i + 1])
+                               for i in range(workers)]
+                    extracted = [page for future in futures for page in future.result()]
+            
+            self.pages = []
+            parts = []
+            for page_num, page_text in extracted:
+                self.pages.append({
+                    'page_number': page_num + 1,
+                    'text': page_text
+                })
+                parts.append(f"\n--- Page {page_num + 1} ---\n{page_text}\n")
+            
+            # Join once at the end instead of re-allocating the string per page
+            self.text = "".join(parts)
+            return self.text
                 
         except Exception as e:
             st.error(f"Error extracting text from PDF: {str(e)}")
@@ -36,26 +82,35 @@ class PDFProcessor:
         return self.pages
     
     def get_text_chunks(self, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """Split text into chunks for processing"""
-        if not self.text:
+        """Split text into chunks for processing (chunk_size and overlap are in characters)"""
+        if not self.pages:
             self.extract_text()
         
-        chunks = []
-        text = self.text
-        
-        # Split by pages first
-        page_splits = text.split("--- Page")
-        
-        for i, page_content in enumerate(page_splits[1:], 1):  # Skip first empty split
-            # Further split large pages into smaller chunks
-            if len(page_content) > chunk_size:
-                words = page_content.split()
-                for j in range(0, len(words), chunk_size - overlap):
-                    chunk = " ".join(words[j:j + chunk_size])
-                    if chunk.strip():
-                        chunks.append(f"Page {i}: {chunk.strip()}")
-            else:
-                if page_content.strip():
-                    chunks.append(f"Page {i}: {page_content.strip()}")
+        # Chunk each page directly rather than re-splitting the joined text
+        return [chunk for page in self.pages
+                for chunk in _page_chunks(page['page_number'], page['text'], chunk_size, overlap)]
+    
+    def iter_chunks(self, chunk_size: int = 1000, overlap: int = 200) -> Iterator[str]:
+        """Yield the same chunks as get_text_chunks without holding the document text or the
+        chunk list in memory. Pages are extracted by worker processes a few small ranges
+        ahead of the consumer and yielded in page order."""
+        with fitz.open(self.pdf_path) as doc:
+            num_pages = doc.page_count
+            workers = _extract_workers(num_pages)
+            if workers == 1:
+                for page_num in range(num_pages):
+                    yield from _page_chunks(page_num + 1, doc[page_num].get_text("text"), chunk_size, overlap)
+                return
         
-        return chunks
+        ranges = ((start, min(start + STREAM_PAGES_PER_TASK, num_pages))
+                  for start in range(0, num_pages, STREAM_PAGES_PER_TASK))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Bounded look-ahead: a slow consumer (embedding) never lets extracted text pile up
+            pending = deque(executor.submit(_extract_page_range, self.pdf_path, start, stop)
+                            for start, stop in islice(ranges, workers * STREAM_TASKS_PER_WORKER))
+            while pending:
+                pages = pending.popleft().result()
+                for start, stop in islice(ranges, 1):
+                    pending.append(executor.submit(_extract_page_range, self.pdf_path, start, stop))
+                for page_num, page_text in pages:
+                    yield from _page_chunks(page_num + 1, page_text, chunk_size, overlap)
@@ -1,22 +1,36 @@
 import re, numpy as np
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer, util
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator
 import google.generativeai as genai
 from config import GEMINI_API_KEY
+from semantic_cache import SemanticCache, strip_no_cache
+
+# Sentence boundary: whitespace following terminal punctuation
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Weather vocabulary, matched from the start of a word in a single scan ("rain" but not
+# "brain"); stems take any ending, so "forecasting", "humid" and "climatic" still count
+WEATHER_QUERY_RE = re.compile(
+    r'\b(?:weather\w*|forecast\w*|temperature\w*|rain(?:s|y|ing|ed|fall)?|sunny|cloudy|humid\w*|'
+    r'precipitation\w*|wind(?:s|y)?|climat\w*|degrees?)\b|°\s*[cf]\b',
+    re.IGNORECASE
+)
+
+# Returned when Gemini is unreachable; never cached
+FALLBACK_RESPONSE = "I'd be happy to help with that! Please try again in a moment."
 
 class RAGEngine:
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, response_cache_path: str = None):
         self.vector_store = vector_store
-        # Use strong embedding model for semantic similarity
-        self.sim_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-        # Check if the similarity model is available
-        try:
-            # Test if model loads successfully
-            test_emb = self.sim_model.encode(["test"], normalize_embeddings=True)
-            self.sim_model_available = True
-        except Exception:
-            # Model loading errors
-            self.sim_model_available = False
+        # Share the vector store's embedding model so retrieval and reranking use one
+        # embedding space and the model is loaded only once
+        self.sim_model = vector_store.model
+        # Query embeddings come from the vector store's LRU, so a question is encoded once
+        self._embed_query = vector_store.embed_query
+        # Semantic cache of previous answers, namespaced per user (persisted when a path is given)
+        self.response_cache = SemanticCache(vector_store.dimension, path=response_cache_path)
+        # Background worker that runs vector search while the Gemini call is in flight
+        self._retrieval_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-retrieval")
         
         # Initialize Gemini AI for answer generation
         try:
@@ -30,20 +44,29 @@ class RAGEngine:
 
     def split_sentences(self, text: str) -> List[str]:
         """Split text into sentences and filter short/noisy ones"""
-        s = re.split(r'(?<=[.!?])\s+', text.strip())
         # clean and filter very short/noisy
-        return [t.strip() for t in s if len(t.strip()) > 15]
+        return [t for t in (s.strip() for s in SENTENCE_SPLIT_RE.split(text.strip())) if len(t) > 15]
+
+    def _sentence_similarities(self, query: str, sentences: List[str]) -> np.ndarray:
+        """Cosine similarity of each sentence to the query, in one forward pass over the sentences"""
+        if not sentences:
+            return np.empty(0, dtype=np.float32)
+        # The query embedding comes from the shared LRU, so repeat queries skip its forward pass
+        q_emb = self._embed_query(query)
+        s_emb = self.sim_model.encode(sentences, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+        # Embeddings are normalized, so the dot product is the cosine similarity; a single
+        # BLAS matrix-vector product, already float32 so no extra copy
+        return (s_emb @ q_emb[0]).astype(np.float32, copy=False)
 
     def pick_best_sentences(self, query: str, contexts: List[str], n: int = 3) -> List[str]:
         """Pick top n best sentences based on semantic similarity with query"""
-        if not self.sim_model_available:
+        sims = self._sentence_similarities(query, contexts)
+        # Get indices of top n most similar sentences: O(N) partition, then sort only those n
+        n = min(n, len(sims))
+        if n <= 0:
             return []
-        # Embed query and candidate sentences, pick highest cosine similarities
-        q_emb = self.sim_model.encode([query], normalize_embeddings=True)
-        s_emb = self.sim_model.encode(contexts, normalize_embeddings=True)
-        sims = util.cos_sim(q_emb, s_emb).cpu().numpy()[0]
-        # Get indices of top n most similar sentences
-        top_indices = np.argsort(sims)[-n:][::-1]  # Get top n indices in descending order
+        top_indices = np.argpartition(-sims, n - 1)[:n]
+        top_indices = top_indices[np.argsort(-sims[top_indices])]  # Descending order
         return [contexts[idx] for idx in top_indices]
 
     def retrieve_relevant_docs(self, query: str, k: int = 6) -> List[str]:
@@ -56,43 +79,38 @@ class RAGEngine:
         if not sentences:
             return "I couldn't find this information in the document."
 
+        sims = self._sentence_similarities(query, sentences)
+
         # Filter sentences by relevance threshold
-        relevant_sentences = []
-        q_emb = self.sim_model.encode([query], normalize_embeddings=True)
-        for sentence in sentences:
-            s_emb = self.sim_model.encode([sentence], normalize_embeddings=True)
-            similarity = util.cos_sim(q_emb, s_emb).cpu().numpy()[0][0]
-            if similarity >= threshold:
-                relevant_sentences.append((sentence, similarity))
-
-        if not relevant_sentences:
+        relevant_idx = np.flatnonzero(sims >= threshold)
+        if relevant_idx.size == 0:
             return "I couldn't find this information in the document."
 
         # Sort by relevance and take top sentences
-        relevant_sentences.sort(key=lambda x: x[1], reverse=True)
-        top_sentences = [sent for sent, _ in relevant_sentences[:3]]  # Take top 3
+        top_idx = relevant_idx[np.argsort(-sims[relevant_idx], kind='stable')[:3]]  # Take top 3
+        top_sentences = [sentences[idx] for idx in top_idx]
 
         # Combine sentences into a coherent answer
         if len(top_sentences) == 1:
             return top_sentences[0]
         else:
             # Combine multiple sentences for more detailed answer
-            combined_answer = top_sentences[0]
+            parts = [top_sentences[0]]
+            # Lower-cased copy kept alongside so each check doesn't re-lower the whole answer
+            combined_lower = top_sentences[0].lower()
             # Add additional context if sentences are related
             for sent in top_sentences[1:]:
                 # Check if this sentence adds new information
-                if sent.lower() not in combined_answer.lower():
-                    combined_answer += " " + sent
-            return combined_answer
+                sent_lower = sent.lower()
+                if sent_lower not in combined_lower:
+                    parts.append(sent)
+                    combined_lower += " " + sent_lower
+            return " ".join(parts)
 
-    def generate_response(self, query: str, context_docs: List[str] = None) -> str:
-        """Generate a response using Google Gemini AI"""
-        if not self.gemini_available:
-            return self._fallback_generate_response(query, context_docs or [])
-            
-        try:
-            # Use a more direct and concise prompt
-            prompt = f"""Please provide a clear, helpful, and informative answer to the following question.
+    def _answer_prompt(self, query: str) -> str:
+        """Prompt for general questions"""
+        # Use a more direct and concise prompt
+        return f"""Please provide a clear, helpful, and informative answer to the following question.
             
             Question: {query}
             
@@ -106,8 +124,31 @@ class RAGEngine:
             - Sound confident and natural in your response
             
             Answer:"""
+
+    def _weather_prompt(self, question: str) -> str:
+        """Prompt for weather questions, which skip document retrieval"""
+        return f"""You are a professional weather forecaster. Please provide a helpful and informative weather forecast based on the following question:
+                    
+                    Question: {question}
+                    
+                    Guidelines for your response:
+                    1. Provide a clear and direct weather forecast
+                    2. Include relevant details like temperature, precipitation, wind, and general conditions
+                    3. If specific location is mentioned, provide location-specific forecast
+                    4. Keep the response concise but informative (2-3 paragraphs maximum)
+                    5. Use a friendly and professional tone
+                    6. Present the information as if you're a weather expert providing a forecast
+                    7. If you don't have specific data, provide a general forecast based on seasonal patterns
+                    
+                    Weather forecast:"""
+
+    def generate_response(self, query: str, context_docs: List[str] = None) -> str:
+        """Generate a response using Google Gemini AI"""
+        if not self.gemini_available:
+            return self._fallback_generate_response(query, context_docs or [])
             
-            response = self.gemini_model.generate_content(prompt)
+        try:
+            response = self.gemini_model.generate_content(self._answer_prompt(query))
             return response.text.strip()
             
         except Exception as e:
@@ -121,7 +162,7 @@ class RAGEngine:
     def _fallback_generate_response(self, query: str, context_docs: List[str] = None) -> str:
         """Fallback method that provides a helpful response using general knowledge"""
         if not self.gemini_available:
-            return "I'd be happy to help with that! Please try again in a moment."
+            return FALLBACK_RESPONSE
             
         try:
             prompt = f"""Please provide a helpful and informative answer to the following question.
@@ -143,35 +184,90 @@ class RAGEngine:
             
         except Exception as e:
             print(f"Gemini API error in fallback: {e}")
-            return "I'd be happy to help with that! Please try again in a moment."
+            return FALLBACK_RESPONSE
+
+    def _stream_generate(self, prompt: str, query: str, parts: List[str]) -> Iterator[str]:
+        """Yield Gemini's response to prompt as it is generated, appending each piece to parts.
+        Returns True if the stream completed; falls back to a blocking answer if it never started."""
+        if not self.gemini_available:
+            parts.append(self._fallback_generate_response(query))
+            yield parts[-1]
+            return True
+
+        try:
+            for chunk in self.gemini_model.generate_content(prompt, stream=True):
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield text
+            return True
+        except Exception as e:
+            print(f"Gemini API error while streaming: {e}")
+            if parts:
+                # Part of the answer is already on screen; don't append a second one
+                return False
+            parts.append(self._fallback_generate_response(query))
+            yield parts[-1]
+            return True
 
     def is_weather_query(self, question: str) -> bool:
         """Check if the question is about weather forecast"""
-        weather_terms = ['weather', 'forecast', 'temperature', 'rain', 'sunny', 'cloudy', 'humidity',
-                        'precipitation', 'wind', 'climate', 'temperature', 'degree', '°C', '°F']
-        return any(term in question.lower() for term in weather_terms)
+        return WEATHER_QUERY_RE.search(question) is not None
+
+    def query(self, question: str, k: int = 6, namespace: str = "") -> Dict[str, Any]:
+        """Main query method: answers near-duplicate questions from the semantic cache.
+        A trailing "[no-cache]" forces a fresh answer."""
+        question, use_cache = strip_no_cache(question)
+        q_emb = self._embed_query(question)
+        if use_cache:
+            cached = self.response_cache.search(q_emb, namespace)
+            if cached is not None:
+                return {**cached, "question": question}
+
+        result = self._answer(question, k)
+        if result["response"] != FALLBACK_RESPONSE:
+            self.response_cache.insert(q_emb, result, namespace)
+        return result
+
+    def query_stream(self, question: str, k: int = 6, namespace: str = "") -> Iterator[str]:
+        """Streaming variant of query(): yields the response text as Gemini produces it"""
+        question, use_cache = strip_no_cache(question)
+        q_emb = self._embed_query(question)
+        if use_cache:
+            cached = self.response_cache.search(q_emb, namespace)
+            if cached is not None:
+                yield cached["response"]
+                return
+
+        # Weather questions skip retrieval; otherwise search runs while Gemini streams
+        if self.is_weather_query(question):
+            docs_future = None
+            prompt = self._weather_prompt(question)
+        else:
+            docs_future = self._retrieval_executor.submit(self.retrieve_relevant_docs, question, k)
+            prompt = self._answer_prompt(question)
 
-    def query(self, question: str, k: int = 6) -> Dict[str, Any]:
-        """Main query method that retrieves and generates response"""
+        parts = []
+        complete = yield from self._stream_generate(prompt, question, parts)
+        relevant_docs = docs_future.result() if docs_future else []
+
+        response = "".join(parts).strip()
+        if complete and response != FALLBACK_RESPONSE:
+            self.response_cache.insert(q_emb, {
+                "question": question,
+                "response": response,
+                "relevant_docs": relevant_docs,
+                "num_docs_retrieved": len(relevant_docs),
+                "gemini_available": self.gemini_available
+            }, namespace)
+
+    def _answer(self, question: str, k: int = 6) -> Dict[str, Any]:
+        """Retrieve relevant documents and generate a response"""
         # For weather queries, skip document retrieval and use Gemini directly
         if self.is_weather_query(question):
             if self.gemini_available:
                 try:
-                    prompt = f"""You are a professional weather forecaster. Please provide a helpful and informative weather forecast based on the following question:
-                    
-                    Question: {question}
-                    
-                    Guidelines for your response:
-                    1. Provide a clear and direct weather forecast
-                    2. Include relevant details like temperature, precipitation, wind, and general conditions
-                    3. If specific location is mentioned, provide location-specific forecast
-                    4. Keep the response concise but informative (2-3 paragraphs maximum)
-                    5. Use a friendly and professional tone
-                    6. Present the information as if you're a weather expert providing a forecast
-                    7. If you don't have specific data, provide a general forecast based on seasonal patterns
-                    
-                    Weather forecast:"""
-                    response = self.gemini_model.generate_content(prompt)
+                    response = self.gemini_model.generate_content(self._weather_prompt(question))
                     return {
                         "question": question,
                         "response": response.text.strip(),
@@ -183,8 +279,11 @@ class RAGEngine:
                     print(f"Gemini API error in weather query: {e}")
         
         # For non-weather queries, use the standard flow
-        relevant_docs = self.retrieve_relevant_docs(question, k)
-        response = self.generate_response(question, relevant_docs)
+        # The prompt does not depend on the retrieved documents, so overlap the
+        # embedding + FAISS search with the Gemini round-trip
+        docs_future = self._retrieval_executor.submit(self.retrieve_relevant_docs, question, k)
+        response = self.generate_response(question)
+        relevant_docs = docs_future.result()
 
         return {
             "question": question,
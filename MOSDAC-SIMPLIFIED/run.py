@@ -15,7 +15,7 @@ def check_requirements():
         import openai
         import faiss
         import sentence_transformers
-        import PyPDF2
+        import fitz
         print("✅ All required packages are installed")
         return True
     except ImportError as e:
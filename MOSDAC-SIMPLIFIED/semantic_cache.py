@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import atexit
+import threading
+import numpy as np
+import faiss
+from typing import Dict, Any, Optional
+
+# Near-duplicate prompts above this cosine similarity reuse the cached answer
+SEMANTIC_CACHE_THRESHOLD = 0.93
+SEMANTIC_CACHE_SIZE = 500
+SEMANTIC_CACHE_TTL = 3600  # seconds
+# Minimum seconds between writes of a persistent cache (also written at exit)
+SEMANTIC_CACHE_SAVE_INTERVAL = 30
+
+# Prompts ending with this marker bypass the cache and always get a fresh answer
+NO_CACHE_SUFFIX = "[no-cache]"
+
+
+def strip_no_cache(prompt: str):
+    """Return (prompt without the no-cache marker, whether the cache may be used)"""
+    stripped = prompt.rstrip()
+    if stripped.lower().endswith(NO_CACHE_SUFFIX):
+        return stripped[:-len(NO_CACHE_SUFFIX)].rstrip(), False
+    return prompt, True
+
+
+class SemanticCache:
+    """Cache of answers keyed on prompt embeddings, one FAISS index per namespace.
+    With a path, entries are persisted to <path>.npy (embeddings) and <path>.json (results)."""
+
+    def __init__(self, dimension: int, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_SIZE, ttl: float = SEMANTIC_CACHE_TTL,
+                 path: str = None):
+        self.dimension = dimension
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        # namespace -> (index of prompt embeddings, parallel list of [expires_at, last_used, result])
+        self._namespaces = {}
+        # Shared across Streamlit sessions, so guard the indices
+        self._lock = threading.Lock()
+        # Serializes saves, so the .npy and .json pair on disk always come from one snapshot
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.time()
+        if path:
+            self._load()
+            atexit.register(self.save)
+
+    def _bucket(self, namespace: str):
+        bucket = self._namespaces.get(namespace)
+        if bucket is None:
+            bucket = self._namespaces[namespace] = (faiss.IndexFlatIP(self.dimension), [])
+        return bucket
+
+    def _purge_expired(self, index, entries, now: float):
+        """Drop expired entries; they were inserted in order, so they form a prefix"""
+        expired = 0
+        while expired < len(entries) and entries[expired][0] <= now:
+            expired += 1
+        if expired:
+            index.remove_ids(np.arange(expired, dtype=np.int64))
+            del entries[:expired]
+            self._dirty = True
+
+    def search(self, embedding: np.ndarray, namespace: str = "") -> Optional[Dict[str, Any]]:
+        """Return the cached result for a near-duplicate prompt in this namespace, or None"""
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            if bucket is None:
+                return None
+            index, entries = bucket
+            now = time.time()
+            self._purge_expired(index, entries, now)
+            if index.ntotal == 0:
+                return None
+            scores, indices = index.search(embedding, 1)
+            if scores[0][0] >= self.threshold:
+                entry = entries[indices[0][0]]
+                entry[1] = now
+                return entry[2]
+            return None
+
+    def insert(self, embedding: np.ndarray, result: Dict[str, Any], namespace: str = ""):
+        """Cache a result under its prompt embedding, evicting the least recently used entry when full"""
+        with self._lock:
+            index, entries = self._bucket(namespace)
+            now = time.time()
+            self._purge_expired(index, entries, now)
+            if index.ntotal >= self.max_entries:
+                lru = min(range(len(entries)), key=lambda i: entries[i][1])
+                index.remove_ids(np.array([lru], dtype=np.int64))
+                del entries[lru]
+            index.add(embedding)
+            entries.append([now + self.ttl, now, result])
+            self._dirty = True
+        if self.path and now - self._last_save >= SEMANTIC_CACHE_SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        if not self.path:
+            return
+        # Searches and inserts only wait for the snapshot; the file writes happen under
+        # the save lock alone
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                vectors, records = [], []
+                for namespace, (index, entries) in self._namespaces.items():
+                    if entries:
+                        vectors.append(index.reconstruct_n(0, index.ntotal))
+                        records.extend([namespace, *entry] for entry in entries)
+                matrix = np.vstack(vectors) if vectors else np.empty((0, self.dimension), dtype='float32')
+                self._dirty = False
+                self._last_save = time.time()
+
+            try:
+                # Write both files under temporary names, then swap them in
+                with open(f"{self.path}.npy.tmp", 'wb') as f:
+                    np.save(f, matrix)
+                with open(f"{self.path}.json.tmp", 'w', encoding='utf-8') as f:
+                    json.dump({"dimension": self.dimension, "entries": records}, f)
+                os.replace(f"{self.path}.npy.tmp", f"{self.path}.npy")
+                os.replace(f"{self.path}.json.tmp", f"{self.path}.json")
+            except Exception as e:
+                print(f"Warning: could not save semantic cache: {e}")
+
+    def _load(self):
+        """Load unexpired entries from disk; a missing or mismatched cache starts empty"""
+        try:
+            matrix = np.load(f"{self.path}.npy")
+            with open(f"{self.path}.json", 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        records = data.get("entries", [])
+        if data.get("dimension") != self.dimension or len(records) != len(matrix):
+            return
+
+        now = time.time()
+        for vector, (namespace, expires_at, last_used, result) in zip(matrix, records):
+            if expires_at <= now:
+                continue
+            index, entries = self._bucket(namespace)
+            if index.ntotal >= self.max_entries:
+                continue
+            index.add(np.ascontiguousarray(vector[None, :], dtype='float32'))
+            entries.append([expires_at, last_used, result])
@@ -29,7 +29,7 @@ def install_requirements():
         except subprocess.CalledProcessError as e2:
             print(f"❌ Error installing minimal requirements: {e2}")
             print("💡 Please try installing manually:")
-            print("   pip install streamlit langchain google-generativeai faiss-cpu sentence-transformers pypdf2")
+            print("   pip install streamlit langchain google-generativeai faiss-cpu sentence-transformers pymupdf")
             return False
 
 def create_env_file():
@@ -0,0 +1,51 @@
+import pytest
+
+import auth
+
+
+@pytest.fixture
+def dashboard(tmp_path, monkeypatch):
+    """dashboard module backed by a fresh database in tmp_path"""
+    # Pooled connections still point at whichever database was used before
+    auth._close_pool()
+    monkeypatch.setattr(auth, 'DB_NAME', str(tmp_path / 'users.db'))
+    monkeypatch.setattr(auth, '_database_ready', False)
+    import dashboard
+    monkeypatch.setattr(dashboard, '_schema_ready', False)
+    dashboard.update_database_schema()
+    yield dashboard
+    auth._close_pool()
+
+
+@pytest.fixture
+def user_id(dashboard):
+    auth.register_user('tester', 'tester@example.com', 'Tester@123')
+    conn = auth.get_db_connection()
+    try:
+        return conn.execute("SELECT id FROM users WHERE username = 'tester'").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_recent_messages_start_on_a_question(dashboard, user_id):
+    for i in range(3):
+        dashboard.log_chat(user_id, f'question {i}', f'answer {i}')
+
+    # An odd limit never splits a turn, so the history never opens with a bare answer
+    messages = dashboard.get_recent_messages(user_id, 3)
+    assert [m['role'] for m in messages] == ['user', 'assistant']
+    assert [m['content'] for m in messages] == ['question 2', 'answer 2']
+
+    messages = dashboard.get_recent_messages(user_id, 4)
+    assert [m['content'] for m in messages] == ['question 1', 'answer 1', 'question 2', 'answer 2']
+
+
+def test_recent_messages_fill_limit_with_unanswered_turns(dashboard, user_id):
+    dashboard.log_chat(user_id, 'question 0', 'answer 0')
+    dashboard.log_chat(user_id, 'question 1')
+    dashboard.log_chat(user_id, 'question 2')
+
+    messages = dashboard.get_recent_messages(user_id, 3)
+    assert [m['content'] for m in messages] == ['question 1', 'question 2']
+    messages = dashboard.get_recent_messages(user_id, 4)
+    assert [m['content'] for m in messages] == ['question 0', 'answer 0', 'question 1', 'question 2']
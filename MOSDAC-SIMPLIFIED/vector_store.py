@@ -1,62 +1,249 @@
 import faiss
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Tuple
+from typing import List, Tuple, Iterable
+from collections.abc import Sequence
 import pickle
 import os
+import json
+import hashlib
+import sqlite3
+import queue
+import threading
+from functools import lru_cache
+from itertools import islice
+
+# HNSW graph parameters (used once the corpus outgrows brute-force search)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_MIN_VECTORS = 1000
+# Chunks per forward pass when embedding documents
+EMBED_BATCH_SIZE = 128
+# Batches read ahead of the embedder when adding texts from a stream
+STREAM_PREFETCH_BATCHES = 4
+# Max host parameters per SQLite IN (...) lookup against the embedding cache
+CACHE_LOOKUP_BATCH = 500
+# Shared result for rows stored without metadata (treat as read-only)
+EMPTY_METADATA = {}
+
+def _prefetch_batches(texts: Iterable[str], first: int, batch_size: int):
+    """Yield lists of texts (the first of up to `first` items, then `batch_size`), read
+    ahead on a daemon thread through a bounded queue"""
+    batches = queue.Queue(maxsize=STREAM_PREFETCH_BATCHES)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        # Poll so the producer exits if the consumer stops early
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            it = iter(texts)
+            size = first
+            while (batch := list(islice(it, size))) and put(batch):
+                size = batch_size
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    threading.Thread(target=produce, name="vector-store-prefetch", daemon=True).start()
+    try:
+        while (item := batches.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+class MappedTexts(Sequence):
+    """Read-only view of texts stored as one memory-mapped UTF-8 blob plus offsets"""
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+    
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+    
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("text index out of range")
+        # Only the requested row is paged in and decoded
+        return self._blob[self._offsets[idx]:self._offsets[idx + 1]].tobytes().decode('utf-8')
+
 
 class VectorStore:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", query_cache_size: int = 1024,
+                 embedding_cache_path: str = None):
+        self.model_name = model_name
+        # Optional SQLite file mapping text hash -> float32 embedding bytes
+        self.embedding_cache_path = embedding_cache_path
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = SentenceTransformer(model_name, device=device)
+        if device == "cuda":
+            # FP16 inference halves activation bandwidth on GPU
+            self.model.half()
         self.dimension = 384  # Dimension for all-MiniLM-L6-v2
         self.index = None
         self.texts = []
-        self.metadata = []
+        # Sparse {row index: metadata}; rows without metadata take no space
+        self.metadata = {}
+        # Per-instance LRU of normalized query embeddings, keyed on the query string
+        self.embed_query = lru_cache(maxsize=query_cache_size)(self._encode_query)
         
-    def create_index(self):
-        """Create a new FAISS index"""
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+    def create_index(self, num_vectors: int = 0):
+        """Create a new FAISS index suited to the expected number of vectors"""
+        if num_vectors < HNSW_MIN_VECTORS:
+            # Brute force beats graph traversal on small corpora
+            self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+        else:
+            # int8 scalar-quantized storage: 4x less memory and bandwidth per search
+            self.index = faiss.IndexHNSWSQ(self.dimension, faiss.ScalarQuantizer.QT_8bit,
+                                           HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
         
     def add_texts(self, texts: List[str], metadata: List[dict] = None):
         """Add texts to the vector store"""
+        # Blank texts would only add noise vectors; drop them (and their metadata) up front
+        keep = [i for i, text in enumerate(texts) if text and text.strip()]
+        if len(keep) < len(texts):
+            texts = [texts[i] for i in keep]
+            if metadata:
+                metadata = [metadata[i] for i in keep]
+        if not texts:
+            return
+        
         if self.index is None:
-            self.create_index()
+            self.create_index(len(texts))
         
-        # Generate embeddings
-        embeddings = self.model.encode(texts, convert_to_tensor=False)
+        # Generate normalized embeddings, reusing any cached on disk
+        embeddings = self._embed_texts(texts)
         
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
+        # Quantized indexes learn their value ranges from the first batch
+        if not self.index.is_trained:
+            self.index.train(embeddings)
         
         # Add to index
-        self.index.add(embeddings.astype('float32'))
+        self.index.add(embeddings)
         
-        # Store texts and metadata
+        # Store texts and metadata (a memory-mapped store is materialized before growing)
+        if not isinstance(self.texts, list):
+            self.texts = list(self.texts)
+        start = len(self.texts)
         self.texts.extend(texts)
         if metadata:
-            self.metadata.extend(metadata)
-        else:
-            self.metadata.extend([{}] * len(texts))
+            self.metadata.update((start + i, meta) for i, meta in enumerate(metadata) if meta)
+    
+    def add_texts_stream(self, texts: Iterable[str], batch_size: int = EMBED_BATCH_SIZE):
+        """Add texts from an iterable in batches, so the full input is never materialized.
+        Batches are pulled from the iterable on a background thread, so producing them
+        (e.g. PDF extraction and chunking) overlaps with embedding and index writes."""
+        # The index type depends on the corpus size, so buffer up to the HNSW threshold;
+        # that first block also serves as the quantizer's training sample
+        first = HNSW_MIN_VECTORS if self.index is None else batch_size
+        for batch in _prefetch_batches(texts, first, batch_size):
+            self.add_texts(batch)
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Generate normalized embeddings (cosine similarity) in large batches"""
+        # Already float32 on CPU, so no copy; FP16 GPU output is widened for FAISS
+        return self.model.encode(
+            texts,
+            batch_size=EMBED_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype('float32', copy=False)
+    
+    def _text_key(self, text: str) -> str:
+        """Cache key for a text, scoped to the embedding model"""
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode(), digest_size=16).hexdigest()
+    
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, encoding only those missing from the on-disk embedding cache"""
+        if not self.embedding_cache_path:
+            return self._encode_texts(texts)
+        
+        keys = [self._text_key(text) for text in texts]
+        embeddings = np.empty((len(texts), self.dimension), dtype='float32')
+        
+        conn = sqlite3.connect(self.embedding_cache_path)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)')
+            
+            # Look up cached vectors
+            cached = {}
+            for i in range(0, len(keys), CACHE_LOOKUP_BATCH):
+                batch = keys[i:i + CACHE_LOOKUP_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                cached.update(conn.execute(
+                    f'SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})', batch
+                ).fetchall())
+            
+            missing = []
+            for i, key in enumerate(keys):
+                if key in cached:
+                    embeddings[i] = np.frombuffer(cached[key], dtype='float32')
+                else:
+                    missing.append(i)
+            
+            # Encode cache misses in one batch and write them back
+            if missing:
+                new_embeddings = self._encode_texts([texts[i] for i in missing])
+                embeddings[missing] = new_embeddings
+                conn.executemany(
+                    'INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)',
+                    [(keys[i], new_embeddings[j].tobytes()) for j, i in enumerate(missing)]
+                )
+                conn.commit()
+        finally:
+            conn.close()
+        
+        return embeddings
+    
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Encode and L2-normalize a single query (wrapped by the embed_query LRU)"""
+        return self.model.encode(
+            [query],
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype('float32', copy=False)
     
     def search(self, query: str, k: int = 5) -> List[Tuple[str, float, dict]]:
         """Search for similar texts"""
         if self.index is None or len(self.texts) == 0:
             return []
         
-        # Generate query embedding
-        query_embedding = self.model.encode([query], convert_to_tensor=False)
-        faiss.normalize_L2(query_embedding)
+        # Generate query embedding (cached for repeated queries)
+        query_embedding = self.embed_query(query)
+        
+        # Widen the HNSW candidate list with k to keep recall high
+        if isinstance(self.index, faiss.IndexHNSW):
+            self.index.hnsw.efSearch = max(k * 4, 64)
         
         # Search
-        scores, indices = self.index.search(query_embedding.astype('float32'), k)
+        scores, indices = self.index.search(query_embedding, k)
         
         results = []
         for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.texts):
+            # FAISS pads missing neighbours with -1
+            if 0 <= idx < len(self.texts):
                 results.append((
                     self.texts[idx],
                     float(score),
-                    self.metadata[idx]
+                    self.metadata.get(int(idx), EMPTY_METADATA)
                 ))
         
         return results
@@ -66,21 +253,40 @@ class VectorStore:
         if self.index is not None:
             faiss.write_index(self.index, f"{filepath}.index")
             
-            with open(f"{filepath}.data", 'wb') as f:
-                pickle.dump({
-                    'texts': self.texts,
-                    'metadata': self.metadata
-                }, f)
+            # Texts as a flat UTF-8 blob plus offsets so load() can memory-map them
+            encoded = [text.encode('utf-8') for text in self.texts]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            np.save(f"{filepath}.texts.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            np.save(f"{filepath}.offsets.npy", offsets)
+            
+            with open(f"{filepath}.meta.jsonl", 'w', encoding='utf-8') as f:
+                for idx, meta in self.metadata.items():
+                    f.write(json.dumps([idx, meta]) + "\n")
     
     def load(self, filepath: str):
         """Load the vector store from disk"""
-        if os.path.exists(f"{filepath}.index") and os.path.exists(f"{filepath}.data"):
+        if not os.path.exists(f"{filepath}.index"):
+            return False
+        
+        if all(os.path.exists(f"{filepath}{ext}") for ext in (".texts.npy", ".offsets.npy", ".meta.jsonl")):
+            self.index = faiss.read_index(f"{filepath}.index")
+            self.texts = MappedTexts(
+                np.load(f"{filepath}.texts.npy", mmap_mode='r'),
+                np.load(f"{filepath}.offsets.npy", mmap_mode='r')
+            )
+            with open(f"{filepath}.meta.jsonl", 'r', encoding='utf-8') as f:
+                self.metadata = dict(json.loads(line) for line in f)
+            return True
+        
+        # Legacy pickle sidecar written by earlier versions
+        if os.path.exists(f"{filepath}.data"):
             self.index = faiss.read_index(f"{filepath}.index")
             
             with open(f"{filepath}.data", 'rb') as f:
                 data = pickle.load(f)
                 self.texts = data['texts']
-                self.metadata = data['metadata']
+                self.metadata = {idx: meta for idx, meta in enumerate(data['metadata']) if meta}
             return True
         return False
 